@@ -1,85 +1,314 @@
 import psycopg2
+import psycopg2.extensions
 from psycopg2 import sql
+from psycopg2 import pool as pg_pool
+from psycopg2.extras import execute_values, RealDictCursor
 import logging
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Tuple, Union
+from contextlib import contextmanager
 import threading
+import queue
+import atexit
+import io
 import json
 import os
 import time
 from datetime import datetime
 
+try:
+    import orjson  # Optional: much faster (de)serialization of the download log
+except ImportError:
+    orjson = None
+
+# Default connection parameters, read once at import. Environment variables
+# override the built-in defaults.
+CONN_PARAMS = {
+    'host': os.environ.get("FTP_DB_HOST", "localhost"),
+    'database': os.environ.get("FTP_DB_NAME", "ftp_db"),
+    'user': os.environ.get("FTP_DB_USER", "ftp_user"),
+    'password': os.environ.get("FTP_DB_PASSWORD", "123456"),
+    'port': int(os.environ.get("FTP_DB_PORT", "5432")),
+}
+
+# Connection pool sizing: (2 * cores) + 1 connections covers the FTP worker
+# threads without letting them open an unbounded number of backends.
+DB_POOL_MIN_CONN = 2
+DB_POOL_MAX_CONN = (os.cpu_count() or 1) * 2 + 1
+
+# Download history rows are flushed every LOG_BATCH_SIZE rows or
+# LOG_FLUSH_INTERVAL seconds, whichever comes first.
+LOG_BATCH_SIZE = 100
+LOG_FLUSH_INTERVAL = 2.0
+
+# Batches at least this large (e.g. a catch-up flush after a reconnect) are
+# loaded with COPY into a temporary stage table and merged from there.
+LOG_COPY_MIN_ROWS = 1000
+
+# Escapes for COPY ... FROM STDIN (FORMAT text)
+_COPY_ESCAPE_TABLE = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+HISTORY_UPSERT_CONFLICT = """
+    ON CONFLICT (username, station_id, filename)
+    DO UPDATE SET
+        local_path = EXCLUDED.local_path,
+        status = EXCLUDED.status,
+        message = EXCLUDED.message,
+        created_at = CURRENT_TIMESTAMP
+"""
+
+# Hot upserts are prepared once per pooled connection and then run with
+# EXECUTE, so PostgreSQL skips parsing and planning on every call.
+PREPARED_STATEMENTS = {
+    "upsert_server": """
+        PREPARE upsert_server (varchar, integer, varchar, varchar, varchar, boolean) AS
+        INSERT INTO servers (host, port, username, password, remote_path, is_selected)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        ON CONFLICT (username) DO UPDATE SET
+            host = EXCLUDED.host,
+            port = EXCLUDED.port,
+            password = EXCLUDED.password,
+            remote_path = EXCLUDED.remote_path,
+            is_selected = EXCLUDED.is_selected
+    """,
+    "upsert_station": """
+        PREPARE upsert_station (varchar, varchar, boolean) AS
+        INSERT INTO stations (station_id, username, is_selected)
+        VALUES ($1, $2, $3)
+        ON CONFLICT (station_id, username) DO UPDATE SET
+            is_selected = EXCLUDED.is_selected
+    """,
+    "upsert_setting": """
+        PREPARE upsert_setting (varchar, text) AS
+        INSERT INTO app_settings (key, value, updated_at)
+        VALUES ($1, $2, CURRENT_TIMESTAMP)
+        ON CONFLICT (key) DO UPDATE SET
+            value = EXCLUDED.value,
+            updated_at = CURRENT_TIMESTAMP
+    """,
+}
+
+# Column types of the servers fields update_server may change. The UPDATE
+# for each distinct combination of fields is generated once, registered in
+# PREPARED_STATEMENTS and reused, so the same statement text hits the
+# server-side plan every time.
+UPDATE_SERVER_FIELDS = {
+    "host": "varchar",
+    "port": "integer",
+    "password": "varchar",
+    "remote_path": "varchar",
+    "is_selected": "boolean",
+}
+_UPDATE_SERVER_STATEMENTS: Dict[Tuple[str, ...], str] = {}
+
+
+def _update_server_statement(fields: Tuple[str, ...]) -> str:
+    """Return the prepared statement name updating exactly these servers fields."""
+    name = _UPDATE_SERVER_STATEMENTS.get(fields)
+    if name is None:
+        name = "update_server_" + "_".join(fields)
+        types = ", ".join(UPDATE_SERVER_FIELDS[field] for field in fields)
+        assignments = ", ".join(f"{field} = ${i}" for i, field in enumerate(fields, start=1))
+        PREPARED_STATEMENTS[name] = (
+            f"PREPARE {name} ({types}, varchar) AS "
+            f"UPDATE servers SET {assignments} WHERE username = ${len(fields) + 1}"
+        )
+        _UPDATE_SERVER_STATEMENTS[fields] = name
+    return name
+
+
+# Errors that mean the pooled connection itself is unusable. These are
+# detected on real use and the connection is discarded, rather than
+# probing every connection with SELECT 1 before each query.
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+# Read-mostly lookups (settings, servers, stations) are cached in-process
+# for this many seconds and invalidated on every write that touches them.
+CACHE_TTL = 60.0
+_CACHE_MISS = object()
+
+
+class PreparingConnection(psycopg2.extensions.connection):
+    """Connection that remembers which server-side statements it has prepared."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+# One pool per process for every ThreadSafeDB instance
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool():
+    """Return the process-wide pool over CONN_PARAMS, creating it on first use."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None or _shared_pool.closed:
+            _shared_pool = pg_pool.ThreadedConnectionPool(DB_POOL_MIN_CONN, DB_POOL_MAX_CONN, **CONN_PARAMS)
+        return _shared_pool
+
+
+def close_shared_pool():
+    """Close the process-wide pool, if it was ever opened."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is not None:
+            try:
+                _shared_pool.closeall()
+            except Exception as e:
+                logging.error(f"Error closing DB pool: {e}")
+            finally:
+                _shared_pool = None
+
+
 class ThreadSafeDB:
-    """Lightweight DB access for threads with auto reconnect."""
+    """Lightweight DB access for threads, backed by the shared connection pool."""
     def __init__(self):
-        import psycopg2
-        self.conn = psycopg2.connect(
-            host="localhost",
-            database="ftp_db",
-            user="ftp_user",
-            password="123456",
-            port=5432
-        )
-        self.lock = threading.Lock()
+        self.pool = None
+        self.connect()
+
+        # Download log rows are buffered and written with one INSERT per batch
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._stop_event = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="download-history-flusher", daemon=True)
+        self._flusher.start()
 
     def connect(self):
         try:
-            self.connection = psycopg2.connect(**self.conn_params)
+            self.pool = get_shared_pool()
         except Exception as e:
             logging.error(f"DB connection failed: {e}")
-            self.connection = None
+            self.pool = None
 
-    def execute(self, query, params=None, fetch=False):
-        with self._lock:
-            if self.connection is None:
-                self.connect()
-            if self.connection is None:
-                return None
+    def _with_connection(self, work):
+        """Run work(conn) on a pooled connection and commit; None on failure."""
+        if self.pool is None:
+            self.connect()
+        if self.pool is None:
+            return None
+        db_pool = self.pool
+        conn = db_pool.getconn()
+        discard = False
+        try:
+            result = work(conn)
+            conn.commit()
+            return result
+        except CONNECTION_ERRORS as e:
+            logging.error(f"DB query failed: {e}")
+            discard = True
+            return None
+        except Exception as e:
+            logging.error(f"DB query failed: {e}")
             try:
-                with self.connection.cursor() as cur:
-                    cur.execute(query, params)
-                    if fetch:
-                        result = cur.fetchall()
-                        self.connection.commit()
-                        return result
-                    self.connection.commit()
-                    return True
-            except Exception as e:
-                logging.error(f"DB query failed: {e}")
-                try:
-                    self.connection.rollback()
-                except:
-                    pass
-                return None
+                conn.rollback()
+            except:
+                discard = True
+            return None
+        finally:
+            db_pool.putconn(conn, close=discard or bool(conn.closed))
+
+    def execute(self, query, params=None, fetch=False):
+        def work(conn):
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return cur.fetchall() if fetch else True
+        return self._with_connection(work)
 
     def log_download(self, username, station_id, filename, local_path, status, message):
-        with self.lock:
-            try:
-                cur = self.conn.cursor()
-                cur.execute("""
-                    INSERT INTO download_history (username, station_id, filename, local_path, status, message)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (username, station_id, filename)
-                    DO UPDATE SET
-                        local_path = EXCLUDED.local_path,
-                        status = EXCLUDED.status,
-                        message = EXCLUDED.message,
-                        created_at = CURRENT_TIMESTAMP
-                """, (username, station_id, filename, local_path, status, message))
-                self.conn.commit()
-                cur.close()
-            except Exception as e:
-                print(f"[DB LOG ERROR] {e}")
+        with self._pending_lock:
+            self._pending.append((username, station_id, filename, local_path, status, message))
+            due = (len(self._pending) >= LOG_BATCH_SIZE
+                   or time.monotonic() - self._last_flush >= LOG_FLUSH_INTERVAL)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered download history rows in a single statement."""
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not rows:
+            return True
+
+        # ON CONFLICT cannot touch the same row twice in one statement,
+        # so keep only the latest entry per (username, station_id, filename)
+        rows = list({row[:3]: row for row in rows}.values())
+
+        def work(conn):
+            with conn.cursor() as cur:
+                if len(rows) >= LOG_COPY_MIN_ROWS:
+                    self._copy_history_rows(cur, rows)
+                else:
+                    execute_values(cur, """
+                        INSERT INTO download_history (username, station_id, filename, local_path, status, message)
+                        VALUES %s
+                    """ + HISTORY_UPSERT_CONFLICT, rows, page_size=LOG_BATCH_SIZE)
+            return True
+
+        if self._with_connection(work) is None:
+            print(f"[DB LOG ERROR] Failed to write {len(rows)} download history rows")
+            return False
+        return True
+
+    @staticmethod
+    def _copy_history_rows(cur, rows):
+        """Bulk-load rows with COPY into a session-local stage table, then upsert."""
+        cur.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS download_history_stage (
+                username VARCHAR(255),
+                station_id VARCHAR(255),
+                filename VARCHAR(500),
+                local_path TEXT,
+                status VARCHAR(50),
+                message TEXT
+            ) ON COMMIT DELETE ROWS
+        """)
+        buf = io.StringIO()
+        for row in rows:
+            buf.write("\t".join(
+                "\\N" if value is None else str(value).translate(_COPY_ESCAPE_TABLE)
+                for value in row
+            ))
+            buf.write("\n")
+        buf.seek(0)
+        cur.copy_expert(
+            "COPY download_history_stage (username, station_id, filename, local_path, status, message) "
+            "FROM STDIN WITH (FORMAT text)",
+            buf
+        )
+        cur.execute("""
+            INSERT INTO download_history (username, station_id, filename, local_path, status, message)
+            SELECT username, station_id, filename, local_path, status, message
+            FROM download_history_stage
+        """ + HISTORY_UPSERT_CONFLICT)
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(LOG_FLUSH_INTERVAL):
+            self.flush()
+
+    def close(self):
+        # The pool is shared with other instances; close_shared_pool() owns it
+        self._stop_event.set()
+        self.flush()
+        self.pool = None
 
 class DatabaseManager:
-    def __init__(self, host="localhost", database="ftp_db", user="ftp_user", password="123456", port=5432):
-        self.connection_params = {
+    def __init__(self, host=None, database=None, user=None, password=None, port=None):
+        overrides = {
             'host': host,
             'database': database,
             'user': user,
             'password': password,
             'port': port
         }
-        self.connection = None
+        self.connection_params = dict(CONN_PARAMS)
+        self.connection_params.update({k: v for k, v in overrides.items() if v is not None})
+        self.pool = None
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        self._tx = threading.local()  # connection of the calling thread's open transaction
         self.connect()
         self.create_tables()
         
@@ -89,76 +318,240 @@ class DatabaseManager:
     # ===========================================================
     def connect(self):
         try:
-            self.connection = psycopg2.connect(**self.connection_params)
+            self.pool = pg_pool.ThreadedConnectionPool(
+                DB_POOL_MIN_CONN, DB_POOL_MAX_CONN,
+                connection_factory=PreparingConnection, **self.connection_params
+            )
             logging.info("Database connected successfully")
         except Exception as e:
             logging.error(f"Database connection failed: {e}")
-            self.connection = None
+            self.pool = None
 
     def _ensure_connection(self):
-        """Ensure DB connection is alive; reconnect if necessary."""
-        try:
-            if self.connection is None:
-                self.connect()
-            else:
-                # simple lightweight check
-                with self.connection.cursor() as cur:
-                    cur.execute("SELECT 1")
-            return self.connection is not None
-        except Exception as e:
-            logging.warning(f"DB connection lost, reconnecting: {e}")
+        """Ensure the connection pool exists; recreate it if necessary."""
+        if self.pool is None:
+            self.connect()
+        return self.pool is not None
+
+    def _in_transaction(self) -> bool:
+        return getattr(self._tx, "conn", None) is not None
+
+    def _commit(self, conn):
+        """Commit unless the work belongs to an enclosing transaction()."""
+        if not self._in_transaction():
+            conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        """Run every query issued by this thread inside the block as one transaction.
+
+        Commits once when the block exits and rolls back if it raises.
+        Inside the block, query errors are raised instead of being logged
+        and swallowed. Nested blocks join the outer transaction.
+        """
+        if self._in_transaction():
+            yield
+            return
+        with self._connection() as conn:
+            self._tx.conn = conn
             try:
-                self.connect()
-                return self.connection is not None
-            except Exception as e2:
-                logging.error(f"Reconnect failed: {e2}")
-                self.connection = None
-                return False
+                yield
+                conn.commit()
+            except Exception as e:
+                logging.error(f"Database transaction rolled back: {e}")
+                # PREPARE is not undone by ROLLBACK in every case; start clean
+                try:
+                    conn.rollback()
+                    with conn.cursor() as cursor:
+                        cursor.execute("DEALLOCATE ALL")
+                    conn.commit()
+                except Exception:
+                    pass
+                conn.prepared.clear()
+                raise
+            finally:
+                self._tx.conn = None
+                # Other threads may have cached rows read before the commit
+                with self._cache_lock:
+                    self._cache.clear()
 
-    def execute_query(self, query: str, params: Optional[tuple] = None, fetch: bool = False):
-        """Executes SQL queries safely and reconnects if needed."""
-        # Ensure connection
+    @contextmanager
+    def _connection(self):
+        """Check a connection out of the pool and always hand it back.
+
+        Connections are not pinged before use. Broken ones are closed on
+        return so the pool opens a fresh one for the next caller. Inside
+        transaction() the thread's transaction connection is used instead.
+        """
+        tx_conn = getattr(self._tx, "conn", None)
+        if tx_conn is not None:
+            yield tx_conn
+            return
         if not self._ensure_connection():
-            logging.error("Database connection not established.")
-            return None
+            raise psycopg2.OperationalError("Database connection not initialized.")
+        db_pool = self.pool
+        conn = db_pool.getconn()
+        discard = False
+        try:
+            yield conn
+        except CONNECTION_ERRORS:
+            discard = True
+            raise
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            try:
+                db_pool.putconn(conn, close=discard or bool(conn.closed))
+            except Exception as e:
+                logging.debug(f"Could not return connection to pool: {e}")
 
+    @contextmanager
+    def _autocommit(self, conn):
+        """Run a single read without the BEGIN/COMMIT round trips around it.
+
+        Has no effect inside transaction(), whose reads must share its snapshot.
+        """
+        if self._in_transaction():
+            yield
+            return
+        conn.autocommit = True
         try:
-            with self.connection.cursor() as cursor:
+            yield
+        finally:
+            if not conn.closed:
+                conn.autocommit = False
+
+    def _run_query(self, query: str, params: Optional[tuple] = None, fetch: bool = False,
+                   dict_rows: bool = False):
+        with self._connection() as conn:
+            if fetch:
+                # Reads skip the transaction entirely instead of committing a no-op
+                with self._autocommit(conn):
+                    with conn.cursor(cursor_factory=RealDictCursor if dict_rows else None) as cursor:
+                        cursor.execute(query, params)
+                        return cursor.fetchall()
+            with conn.cursor(cursor_factory=RealDictCursor if dict_rows else None) as cursor:
                 cursor.execute(query, params)
-                if fetch:
-                    results = cursor.fetchall()
-                    self.connection.commit()
-                    return results
-                self.connection.commit()
-                return True
+            self._commit(conn)
+            return True
+
+    def _run_prepared(self, name: str, params: tuple):
+        with self._connection() as conn:
+            with conn.cursor() as cursor:
+                if name not in conn.prepared:
+                    # Commit the PREPARE on its own so a failed EXECUTE
+                    # cannot leave the bookkeeping out of sync
+                    cursor.execute(PREPARED_STATEMENTS[name])
+                    self._commit(conn)
+                    conn.prepared.add(name)
+                placeholders = ", ".join(["%s"] * len(params))
+                cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+            self._commit(conn)
+            return True
+
+    def execute_prepared(self, name: str, params: tuple):
+        """Executes a statement from PREPARED_STATEMENTS, preparing it on first use."""
+        try:
+            return self._run_prepared(name, params)
+        except CONNECTION_ERRORS as e:
+            if self._in_transaction():
+                raise
+            logging.error(f"Database query error: {e}")
+            try:
+                return self._run_prepared(name, params)
+            except Exception as e2:
+                logging.error(f"Database query retry failed: {e2}")
+                return None
         except Exception as e:
+            if self._in_transaction():
+                raise
+            logging.error(f"Database query error: {e}")
+            return None
+
+    def _run_values(self, query: str, rows: List[tuple], page_size: int):
+        with self._connection() as conn:
+            with conn.cursor() as cursor:
+                execute_values(cursor, query, rows, page_size=page_size)
+            # One commit for the whole batch
+            self._commit(conn)
+            return True
+
+    def execute_values_query(self, query: str, rows: List[tuple], page_size: int = 500):
+        """Executes a multi-row INSERT (VALUES %s) for all rows in one transaction."""
+        if not rows:
+            return True
+        try:
+            return self._run_values(query, rows, page_size)
+        except CONNECTION_ERRORS as e:
+            if self._in_transaction():
+                raise
             logging.error(f"Database query error: {e}")
-            # rollback and try to reconnect once
             try:
-                if self.connection:
-                    self.connection.rollback()
-            except Exception:
-                pass
-            # attempt reconnect one more time
+                return self._run_values(query, rows, page_size)
+            except Exception as e2:
+                logging.error(f"Database query retry failed: {e2}")
+                return None
+        except Exception as e:
+            if self._in_transaction():
+                raise
+            logging.error(f"Database query error: {e}")
+            return None
+
+    def execute_query(self, query: str, params: Optional[tuple] = None, fetch: bool = False,
+                      dict_rows: bool = False):
+        """Executes SQL queries safely and reconnects if needed.
+
+        With dict_rows=True, fetched rows are dicts keyed by column name.
+        """
+        try:
+            return self._run_query(query, params, fetch, dict_rows)
+        except CONNECTION_ERRORS as e:
+            if self._in_transaction():
+                raise
+            logging.error(f"Database query error: {e}")
+            # The broken connection was discarded; retry once on a fresh one
             try:
-                self.connect()
-                with self.connection.cursor() as cursor:
-                    cursor.execute(query, params)
-                    if fetch:
-                        results = cursor.fetchall()
-                        self.connection.commit()
-                        return results
-                    self.connection.commit()
-                    return True
+                return self._run_query(query, params, fetch, dict_rows)
             except Exception as e2:
                 logging.error(f"Database query retry failed: {e2}")
-                if self.connection:
-                    try:
-                        self.connection.rollback()
-                    except Exception:
-                        pass
                 return None
+        except Exception as e:
+            if self._in_transaction():
+                raise
+            logging.error(f"Database query error: {e}")
+            return None
+
 
+    # ===========================================================
+    # Read Cache
+    # ===========================================================
+    def _cache_get(self, key):
+        with self._cache_lock:
+            hit = self._cache.get(key)
+            if hit is None:
+                return _CACHE_MISS
+            stored_at, value = hit
+            if time.monotonic() - stored_at >= CACHE_TTL:
+                del self._cache[key]
+                return _CACHE_MISS
+            return value
+
+    def _cache_set(self, key, value):
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic(), value)
+
+    def _cache_invalidate(self, *keys):
+        """Drop cached entries; a one-element key drops every entry of that kind."""
+        with self._cache_lock:
+            for cached_key in list(self._cache):
+                for key in keys:
+                    if cached_key == key or (len(key) == 1 and cached_key[0] == key[0]):
+                        del self._cache[cached_key]
+                        break
 
     # ===========================================================
     # Create Tables
@@ -192,19 +585,54 @@ class DatabaseManager:
                 value TEXT,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS download_history (
+                id BIGSERIAL PRIMARY KEY,
+                username VARCHAR(255) NOT NULL,
+                station_id VARCHAR(255) NOT NULL,
+                filename VARCHAR(500) NOT NULL,
+                local_path TEXT,
+                status VARCHAR(50),
+                message TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            # ThreadSafeDB.flush upserts ON CONFLICT (username, station_id, filename),
+            # which needs this unique index to probe instead of failing/scanning
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_dh_u_s_f
+                ON download_history (username, station_id, filename)
+            """,
+            # Newest-first listing and retention cleanup
+            """
+            CREATE INDEX IF NOT EXISTS ix_dh_created
+                ON download_history (created_at DESC)
             """
         ]
 
-        for query in queries:
-            self.execute_query(query)
+        try:
+            with self.transaction():
+                for query in queries:
+                    self.execute_query(query)
+        except Exception as e:
+            logging.error(f"Failed to create tables: {e}")
 
     # ===========================================================
     # Server Management
     # ===========================================================
     def add_server(self, host: str, port: int, username: str, password: str, remote_path: str, is_selected: bool = False) -> bool:
+        result = self.execute_prepared("upsert_server", (host, port, username, password, remote_path, is_selected))
+        self._cache_invalidate(("servers",))
+        return result is True
+
+    def add_servers_bulk(self, rows: List[tuple]) -> bool:
+        """Upsert many (host, port, username, password, remote_path, is_selected) rows at once."""
+        # Last row wins when the same username appears twice in one batch
+        rows = list({row[2]: row for row in rows}.values())
         query = """
             INSERT INTO servers (host, port, username, password, remote_path, is_selected)
-            VALUES (%s, %s, %s, %s, %s, %s)
+            VALUES %s
             ON CONFLICT (username) DO UPDATE SET
                 host = EXCLUDED.host,
                 port = EXCLUDED.port,
@@ -212,112 +640,107 @@ class DatabaseManager:
                 remote_path = EXCLUDED.remote_path,
                 is_selected = EXCLUDED.is_selected
         """
-        result = self.execute_query(query, (host, port, username, password, remote_path, is_selected))
+        result = self.execute_values_query(query, rows)
+        self._cache_invalidate(("servers",))
         return result is True
 
     def get_servers(self) -> List[Dict[str, Any]]:
+        cached = self._cache_get(("servers",))
+        if cached is not _CACHE_MISS:
+            # Hand out copies so callers cannot mutate the cached rows
+            return [dict(server) for server in cached]
+
         query = "SELECT host, port, username, password, remote_path, is_selected FROM servers ORDER BY username"
-        results = self.execute_query(query, fetch=True)
-        if not results:
+        servers = self.execute_query(query, fetch=True, dict_rows=True)
+        if servers is None:
             return []
-        
-        # Convert to dictionary format for easier access
-        servers = []
-        for row in results:
-            servers.append({
-                'host': row[0],
-                'port': row[1],
-                'username': row[2],
-                'password': row[3],
-                'remote_path': row[4],
-                'is_selected': row[5]
-            })
-        return servers
+        self._cache_set(("servers",), servers)
+        return [dict(server) for server in servers]
 
     def update_server(self, username: str, host: Optional[str] = None, port: Optional[int] = None, 
                      password: Optional[str] = None, remote_path: Optional[str] = None, 
                      is_selected: Optional[bool] = None) -> bool:
-        query = "UPDATE servers SET "
-        updates = []
-        params = []
-
-        if host is not None:
-            updates.append("host = %s")
-            params.append(host)
-        if port is not None:
-            updates.append("port = %s")
-            params.append(port)
-        if password is not None:
-            updates.append("password = %s")
-            params.append(password)
-        if remote_path is not None:
-            updates.append("remote_path = %s")
-            params.append(remote_path)
-        if is_selected is not None:
-            updates.append("is_selected = %s")
-            params.append(is_selected)
-
-        if updates:
-            query += ", ".join(updates) + " WHERE username = %s"
-            params.append(username)
-            result = self.execute_query(query, tuple(params))
+        values = {
+            "host": host,
+            "port": port,
+            "password": password,
+            "remote_path": remote_path,
+            "is_selected": is_selected,
+        }
+        fields = tuple(field for field, value in values.items() if value is not None)
+
+        if fields:
+            params = tuple(values[field] for field in fields) + (username,)
+            result = self.execute_prepared(_update_server_statement(fields), params)
+            self._cache_invalidate(("servers",))
             return result is True
         return False
 
     def delete_server(self, username: str) -> bool:
         query = "DELETE FROM servers WHERE username = %s"
         result = self.execute_query(query, (username,))
+        # Stations are removed by ON DELETE CASCADE
+        self._cache_invalidate(("servers",), ("stations",), ("stations_by_username", username))
         return result is True
 
     # ===========================================================
     # Station Management
     # ===========================================================
     def get_stations_by_username(self, username):
-        if self.connection is None:
-            self.connect()
-            
-        if self.connection is None:
+        cached = self._cache_get(("stations_by_username", username))
+        if cached is not _CACHE_MISS:
+            return [dict(station) for station in cached]
+
+        if not self._ensure_connection():
             raise ConnectionError("Database connection not initialized.")
         
-        with self.connection.cursor() as cur:
-            cur.execute("SELECT station_id FROM stations WHERE username = %s", (username,))
-            rows = cur.fetchall()
-            return [{"station_id": r[0]} for r in rows]
+        with self._connection() as conn:
+            with self._autocommit(conn):
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    cur.execute("SELECT station_id FROM stations WHERE username = %s", (username,))
+                    stations = cur.fetchall()
+        self._cache_set(("stations_by_username", username), stations)
+        return [dict(station) for station in stations]
         
     def add_station(self, station_id: str, username: str, is_selected: bool = False) -> bool:
+        result = self.execute_prepared("upsert_station", (station_id, username, is_selected))
+        self._cache_invalidate(("stations",), ("stations_by_username", username))
+        return result is True
+
+    def add_stations_bulk(self, rows: List[tuple]) -> bool:
+        """Upsert many (station_id, username, is_selected) rows at once."""
+        rows = list({(row[0], row[1]): row for row in rows}.values())
         query = """
             INSERT INTO stations (station_id, username, is_selected)
-            VALUES (%s, %s, %s)
+            VALUES %s
             ON CONFLICT (station_id, username) DO UPDATE SET
                 is_selected = EXCLUDED.is_selected
         """
-        result = self.execute_query(query, (station_id, username, is_selected))
+        result = self.execute_values_query(query, rows)
+        self._cache_invalidate(("stations",), *[("stations_by_username", username) for username in {row[1] for row in rows}])
         return result is True
 
     def get_stations(self, username: Optional[str] = None) -> List[Dict[str, Any]]:
+        cached = self._cache_get(("stations", username))
+        if cached is not _CACHE_MISS:
+            return [dict(station) for station in cached]
+
         if username:
             query = "SELECT station_id, username, is_selected FROM stations WHERE username = %s ORDER BY station_id"
-            results = self.execute_query(query, (username,), fetch=True)
+            results = self.execute_query(query, (username,), fetch=True, dict_rows=True)
         else:
             query = "SELECT station_id, username, is_selected FROM stations ORDER BY username, station_id"
-            results = self.execute_query(query, fetch=True)
+            results = self.execute_query(query, fetch=True, dict_rows=True)
         
-        if not results:
+        if results is None:
             return []
-        
-        # Convert to dictionary format
-        stations = []
-        for row in results:
-            stations.append({
-                'station_id': row[0],
-                'username': row[1],
-                'is_selected': row[2]
-            })
-        return stations
+        self._cache_set(("stations", username), results)
+        return [dict(station) for station in results]
 
     def delete_station(self, station_id: str, username: str) -> bool:
         query = "DELETE FROM stations WHERE station_id = %s AND username = %s"
         result = self.execute_query(query, (station_id, username))
+        self._cache_invalidate(("stations",), ("stations_by_username", username))
         return result is True
 
 
@@ -325,22 +748,43 @@ class DatabaseManager:
     # Application Settings
     # ===========================================================
     def set_setting(self, key: str, value: str) -> bool:
-        query = """
-            INSERT INTO app_settings (key, value, updated_at)
-            VALUES (%s, %s, CURRENT_TIMESTAMP)
-            ON CONFLICT (key) DO UPDATE SET
-                value = EXCLUDED.value,
-                updated_at = CURRENT_TIMESTAMP
-        """
-        result = self.execute_query(query, (key, value))
+        result = self.execute_prepared("upsert_setting", (key, value))
+        self._cache_invalidate(("setting", key))
         return result is True
 
     def get_setting(self, key: str, default: Optional[str] = None) -> Optional[str]:
-        query = "SELECT value FROM app_settings WHERE key = %s"
-        results = self.execute_query(query, (key,), fetch=True)
+        results = self._cache_get(("setting", key))
+        if results is _CACHE_MISS:
+            query = "SELECT value FROM app_settings WHERE key = %s"
+            results = self.execute_query(query, (key,), fetch=True)
+            if results is not None:
+                self._cache_set(("setting", key), results)
         if results and len(results) > 0:
             return results[0][0]
         return default
+
+    def get_settings_bulk(self, keys: List[str], default: Optional[str] = None) -> Dict[str, Optional[str]]:
+        """Return {key: value} for keys, reading every uncached key in one query."""
+        settings = {}
+        missing = []
+        for key in keys:
+            results = self._cache_get(("setting", key))
+            if results is _CACHE_MISS:
+                missing.append(key)
+            else:
+                settings[key] = results[0][0] if results else default
+        if missing:
+            query = "SELECT key, value FROM app_settings WHERE key = ANY(%s)"
+            rows = self.execute_query(query, (missing,), fetch=True)
+            if rows is not None:
+                found = dict(rows)
+                for key in missing:
+                    # Cached in the same shape get_setting() stores
+                    self._cache_set(("setting", key), [(found[key],)] if key in found else [])
+                    settings[key] = found.get(key, default)
+            else:
+                settings.update((key, default) for key in missing)
+        return settings
     
     # ===========================================================
     # Connection Test and Close
@@ -348,28 +792,26 @@ class DatabaseManager:
     def test_connection(self) -> bool:
         """Test if database connection is valid."""
         try:
-            if not self.connection:
-                self.connect()
-            if self.connection is None:
-                return False
-            with self.connection.cursor() as cursor:
-                cursor.execute("SELECT 1;")
-                results = cursor.fetchall()
+            with self._connection() as conn:
+                with self._autocommit(conn):
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT 1;")
+                        results = cursor.fetchall()
                 return len(results) > 0
         except Exception as e:
             logging.error(f"Database connection test failed: {e}")
             return False
 
     def close(self):
-        """Close database connection safely."""
-        if self.connection:
+        """Close all pooled database connections safely."""
+        if self.pool:
             try:
-                self.connection.close()
+                self.pool.closeall()
                 logging.info("Database connection closed.")
             except Exception as e:
                 logging.error(f"Error closing database: {e}")
             finally:
-                self.connection = None
+                self.pool = None
 
     # ===========================================================
     # Selection Update Helpers
@@ -382,6 +824,7 @@ class DatabaseManager:
         else:
             query_set = "UPDATE servers SET is_selected = FALSE WHERE username = %s"
             result = self.execute_query(query_set, (selected_username,))
+        self._cache_invalidate(("servers",))
         return result is True
 
     def update_station_selection(self, station_id: str, username: str, is_selected: bool = True) -> bool:
@@ -392,6 +835,21 @@ class DatabaseManager:
             WHERE station_id = %s AND username = %s
         """
         result = self.execute_query(query, (is_selected, station_id, username))
+        self._cache_invalidate(("stations",))
+        return result is True
+
+    def update_stations_selection_bulk(self, station_ids: List[str], username: str, is_selected: bool = True) -> bool:
+        """Update selected state for many existing stations of one server.
+
+        UPDATE only: a station deleted meanwhile stays deleted.
+        """
+        query = """
+            UPDATE stations
+            SET is_selected = %s
+            WHERE username = %s AND station_id = ANY(%s)
+        """
+        result = self.execute_query(query, (is_selected, username, list(station_ids)))
+        self._cache_invalidate(("stations",), ("stations_by_username", username))
         return result is True
 
     def execute_query_safe(self, query: str, params: Optional[tuple] = None, fetch: bool = False, max_retries: int = 3):
@@ -406,18 +864,12 @@ class DatabaseManager:
                         logging.error("Database connection failed after retries")
                         return None
 
-                with self.connection.cursor() as cursor:
-                    cursor.execute(query, params)
-                    if fetch:
-                        results = cursor.fetchall()
-                        self.connection.commit()
-                        return results
-                    self.connection.commit()
-                    return True
+                return self._run_query(query, params, fetch)
                     
-            except psycopg2.OperationalError as e:
+            except CONNECTION_ERRORS as e:
+                if self._in_transaction():
+                    raise
                 logging.warning(f"Database connection lost (attempt {attempt + 1}/{max_retries}): {e}")
-                self.connection = None
                 if attempt < max_retries - 1:
                     time.sleep(1)
                     continue
@@ -426,12 +878,9 @@ class DatabaseManager:
                     return None
                     
             except Exception as e:
+                if self._in_transaction():
+                    raise
                 logging.error(f"Database query error: {e}")
-                try:
-                    if self.connection:
-                        self.connection.rollback()
-                except:
-                    pass
                 return None
         
         return None
@@ -441,143 +890,364 @@ class DatabaseManager:
 # WINDOWS-COMPATIBLE THREAD-SAFE LOGGING
 # ===========================================================
 
+DOWNLOAD_LOG_FILE = "download_log.jsonl"
+LEGACY_DOWNLOAD_LOG_FILE = "download_log.json"
+DOWNLOAD_LOG_MAX_BYTES = 50 * 1024 * 1024  # Rotate the log once it passes 50 MB
+
+LOG_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# The writer thread collects up to LOG_WRITER_BATCH_MAX entries, waiting at
+# most LOG_WRITER_BATCH_WINDOW seconds after the first, per file append.
+LOG_WRITER_BATCH_MAX = 512
+LOG_WRITER_BATCH_WINDOW = 0.1
+
+# Longest flush_download_log() waits for the writer before giving up
+LOG_FLUSH_TIMEOUT = 10.0
+
+if orjson is not None:
+    _log_loads = orjson.loads
+    _log_decode_errors = (orjson.JSONDecodeError,)
+
+    def _log_dumps_line(entry):
+        return orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE).decode("utf-8")
+else:
+    _log_loads = json.loads
+    _log_decode_errors = (json.JSONDecodeError,)
+
+    def _log_dumps_line(entry):
+        return json.dumps(entry, ensure_ascii=False) + "\n"
+
+# One-pass sanitizer for log fields: quotes become apostrophes, newlines
+# become spaces and carriage returns are dropped
+_LOG_SANITIZE_TABLE = str.maketrans({'"': "'", '\n': ' ', '\r': None})
+
+# Producers only put() on the SimpleQueue, which takes no Python-level lock,
+# so logging threads never wait on each other. _log_lock only orders the
+# writer thread against readers and clear_download_log.
 _log_lock = threading.Lock()
+_log_queue = queue.SimpleQueue()
 
-def append_download_log(username, station_id, filename, local_path, status, message):
-    """Thread-safe download log with Windows file locking support"""
-    log_file = "download_log.json"
+# Entries parsed so far by read_download_log and the byte offset they end at
+_log_read_cache = {"ident": None, "offset": 0, "entries": []}
+
+# POSIX only: O_APPEND descriptor the writer keeps open between batches and
+# the (st_dev, st_ino) of the file it points at
+_log_fd = {"fd": None, "ident": None}
+
+
+def _migrate_legacy_download_log():
+    """Convert the old single-array JSON log into JSON Lines once."""
+    if not os.path.exists(LEGACY_DOWNLOAD_LOG_FILE) or os.path.exists(DOWNLOAD_LOG_FILE):
+        return
+    try:
+        with open(LEGACY_DOWNLOAD_LOG_FILE, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+        data = _log_loads(content) if content else []
+        if not isinstance(data, list):
+            data = []
+        with open(DOWNLOAD_LOG_FILE, "w", encoding="utf-8") as f:
+            for entry in data:
+                f.write(_log_dumps_line(entry))
+        os.rename(LEGACY_DOWNLOAD_LOG_FILE, LEGACY_DOWNLOAD_LOG_FILE + ".migrated")
+        print(f"[INFO] Migrated {len(data)} entries to {DOWNLOAD_LOG_FILE}")
+    except Exception as e:
+        print(f"[WARN] Could not migrate legacy download log: {e}")
+
+
+def _rotate_download_log():
+    """Move a full log aside instead of trimming it in place."""
+    try:
+        if os.path.getsize(DOWNLOAD_LOG_FILE) <= DOWNLOAD_LOG_MAX_BYTES:
+            return
+    except OSError:
+        return
+    rotated = f"download_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    try:
+        os.rename(DOWNLOAD_LOG_FILE, rotated)
+        print(f"[INFO] Download log rotated to: {rotated}")
+    except Exception as e:
+        print(f"[WARN] Could not rotate download log: {e}")
+
+
+def _close_log_fd():
+    """Close the writer's descriptor; the next POSIX append reopens the log."""
+    if _log_fd["fd"] is not None:
+        try:
+            os.close(_log_fd["fd"])
+        except OSError:
+            pass
+    _log_fd.update(fd=None, ident=None)
+
+
+def _append_log_posix(payload: bytes):
+    """Append payload through the writer's persistent O_APPEND descriptor.
+
+    The log is stat'ed once per batch: that drives rotation and notices a
+    file that was rotated, cleared or deleted underneath the open descriptor.
+    """
+    try:
+        st = os.stat(DOWNLOAD_LOG_FILE)
+    except FileNotFoundError:
+        st = None
+    if st is not None and st.st_size > DOWNLOAD_LOG_MAX_BYTES:
+        _rotate_download_log()
+        st = None
+    if _log_fd["fd"] is not None and (st is None or (st.st_dev, st.st_ino) != _log_fd["ident"]):
+        _close_log_fd()
+
+    if _log_fd["fd"] is None:
+        fd = os.open(DOWNLOAD_LOG_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        fst = os.fstat(fd)
+        _log_fd.update(fd=fd, ident=(fst.st_dev, fst.st_ino))
+
+    view = memoryview(payload)
+    while view:
+        view = view[os.write(_log_fd["fd"], view):]
+
+
+def _append_log_file(payload: str):
+    """One rotate-and-append attempt; raises if the file cannot be written."""
+    _rotate_download_log()
+    with open(DOWNLOAD_LOG_FILE, "a", encoding="utf-8") as f:
+        f.write(payload)
+
+
+def _append_log_with_retry(payload: str):
+    """Slow path after a failed append: retry while the file is locked."""
     max_retries = 5
     retry_delay = 0.1  # 100ms between retries
-    
-    # Use global lock to prevent concurrent writes from threads
+    for attempt in range(1, max_retries):
+        time.sleep(retry_delay * attempt)
+        try:
+            _append_log_file(payload)
+            return
+        except PermissionError:
+            # File is locked (Windows), wait and retry
+            if attempt == max_retries - 1:
+                print(f"[ERROR] Download log failed after {max_retries} attempts")
+        except Exception as e:
+            print(f"[ERROR] Failed to write log (attempt {attempt + 1}): {e}")
+            if attempt == max_retries - 1:
+                import traceback
+                traceback.print_exc()
+
+
+def _utf8_safe(value):
+    """value with lone surrogates (undecodable path bytes) backslash-escaped"""
+    if isinstance(value, str):
+        return value.encode("utf-8", "backslashreplace").decode("utf-8")
+    return value
+
+
+def _dumps_log_entry(entry, escape=False) -> str:
+    """Serialize one entry; an entry that still cannot be encoded is dropped."""
+    if not escape:
+        try:
+            return _log_dumps_line(entry)
+        except (TypeError, ValueError):
+            # orjson refuses surrogate-escaped file names; escape them and retry
+            pass
+    try:
+        return _log_dumps_line({key: _utf8_safe(value) for key, value in entry.items()})
+    except (TypeError, ValueError) as e:
+        print(f"[ERROR] Dropping download log entry that cannot be serialized: {e}")
+        return ""
+
+
+def _serialize_log_entries(entries):
+    """Return the (text, UTF-8 bytes) to append for entries."""
+    payload = "".join(_dumps_log_entry(entry) for entry in entries)
+    try:
+        return payload, payload.encode("utf-8")
+    except UnicodeEncodeError:
+        # The stdlib serializer lets lone surrogates through; escape them
+        payload = "".join(_dumps_log_entry(entry, escape=True) for entry in entries)
+        return payload, payload.encode("utf-8")
+
+
+def _write_log_entries(entries):
+    """Append entries to the JSON Lines log, retrying while the file is locked."""
+    payload, data = _serialize_log_entries(entries)
+
     with _log_lock:
-        for attempt in range(max_retries):
+        if os.name != "nt":
+            # Appends cannot hit a sharing lock here, so no retry ladder
             try:
-                # Sanitize all inputs - remove problematic characters
-                safe_username = str(username).replace('"', "'").replace('\n', ' ').replace('\r', '').strip()
-                safe_station = str(station_id).replace('"', "'").replace('\n', ' ').replace('\r', '').strip()
-                safe_filename = str(filename).replace('"', "'").replace('\n', ' ').replace('\r', '').strip()
-                safe_path = str(local_path).replace('"', "'").replace('\n', ' ').replace('\r', '').strip()
-                safe_status = str(status).replace('"', "'").replace('\n', ' ').replace('\r', '').strip()
-                safe_message = str(message).replace('"', "'").replace('\n', ' ').replace('\r', '').strip()
-                
-                log_entry = {
-                    "username": safe_username,
-                    "station_id": safe_station,
-                    "filename": safe_filename,
-                    "local_path": safe_path,
-                    "status": safe_status,
-                    "message": safe_message,
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                
-                data = []
-                
-                # Try to read existing log with retry
-                if os.path.exists(log_file):
-                    try:
-                        with open(log_file, "r", encoding="utf-8") as f:
-                            content = f.read().strip()
-                            if content:
-                                data = json.loads(content)
-                            if not isinstance(data, list):
-                                data = []
-                    except PermissionError:
-                        # File is locked, wait and retry
-                        if attempt < max_retries - 1:
-                            time.sleep(retry_delay * (attempt + 1))
-                            continue
-                        else:
-                            print(f"[WARN] Could not read log after {max_retries} attempts")
-                            data = []
-                    except json.JSONDecodeError:
-                        # Corrupted file - backup and start fresh
-                        backup_file = f"download_log_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json.bak"
-                        try:
-                            os.rename(log_file, backup_file)
-                            print(f"[WARN] Corrupted log backed up as: {backup_file}")
-                        except:
-                            pass
-                        data = []
-                    except Exception as e:
-                        print(f"[ERROR] Error reading log: {e}")
-                        data = []
-                
-                # Append new entry
-                data.append(log_entry)
-                
-                # Keep only last 50,000 entries
-                if len(data) > 50000:
-                    data = data[-50000:]
-                
-                # Write safely using temp file with Windows-compatible approach
-                temp_file = log_file + f".tmp.{os.getpid()}.{threading.get_ident()}"
-                
-                try:
-                    # Write to temp file
-                    with open(temp_file, "w", encoding="utf-8") as f:
-                        json.dump(data, f, indent=2, ensure_ascii=False)
-                    
-                    # Try atomic replace with Windows compatibility
-                    try:
-                        # On Windows, delete first if file exists
-                        if os.path.exists(log_file):
-                            try:
-                                os.remove(log_file)
-                            except PermissionError:
-                                # File is locked, wait and retry
-                                if attempt < max_retries - 1:
-                                    time.sleep(retry_delay * (attempt + 1))
-                                    if os.path.exists(temp_file):
-                                        try:
-                                            os.remove(temp_file)
-                                        except:
-                                            pass
-                                    continue
-                                else:
-                                    raise
-                        
-                        # Rename temp to actual file
-                        os.rename(temp_file, log_file)
-                        
-                        # Success! Break out of retry loop
-                        break
-                        
-                    except Exception as rename_err:
-                        print(f"[ERROR] Failed to rename (attempt {attempt + 1}): {rename_err}")
-                        if os.path.exists(temp_file):
-                            try:
-                                os.remove(temp_file)
-                            except:
-                                pass
-                        
-                        if attempt < max_retries - 1:
-                            time.sleep(retry_delay * (attempt + 1))
-                            continue
-                        else:
-                            raise
-                    
-                except Exception as write_err:
-                    print(f"[ERROR] Failed to write log (attempt {attempt + 1}): {write_err}")
-                    if os.path.exists(temp_file):
-                        try:
-                            os.remove(temp_file)
-                        except:
-                            pass
-                    
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay * (attempt + 1))
-                        continue
-                    else:
-                        print(f"[ERROR] Download log failed after {max_retries} attempts")
-                        break
-                
+                _append_log_posix(data)
             except Exception as e:
-                print(f"[ERROR] Download log failed (attempt {attempt + 1}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay * (attempt + 1))
+                _close_log_fd()
+                print(f"[ERROR] Failed to write log: {e}")
+            return
+
+        try:
+            _append_log_file(payload)
+        except Exception as e:
+            if not isinstance(e, PermissionError):
+                print(f"[ERROR] Failed to write log (attempt 1): {e}")
+            _append_log_with_retry(payload)
+
+
+_LOG_FIELDS = ("username", "station_id", "filename", "local_path", "status", "message")
+
+
+# Last formatted timestamp as [epoch second, text]; only the writer thread uses it
+_log_ts_cache = [None, ""]
+
+
+def _clean_log_field(value) -> str:
+    return str(value).translate(_LOG_SANITIZE_TABLE).strip()
+
+
+def _format_log_timestamp(logged_at: float) -> str:
+    """Format a log time, reusing the previous string within the same second."""
+    second = int(logged_at)
+    if second != _log_ts_cache[0]:
+        _log_ts_cache[0] = second
+        _log_ts_cache[1] = time.strftime(LOG_TIMESTAMP_FORMAT, time.localtime(second))
+    return _log_ts_cache[1]
+
+
+def _build_log_entry(record):
+    """Turn a queued (time, username, station_id, ...) record into a log entry."""
+    # Sanitize all inputs - remove problematic characters
+    entry = {field: _clean_log_field(value) for field, value in zip(_LOG_FIELDS, record[1:])}
+    entry["timestamp"] = _format_log_timestamp(record[0])
+    return entry
+
+
+def _download_log_writer():
+    """Single background writer draining the log queue in batches.
+
+    Queue items are raw records from append_download_log, lists of them from
+    append_download_logs, or Events put by flush_download_log that are set
+    once everything queued before them has been written.
+    """
+    while True:
+        batch = [_log_queue.get()]
+        # Coalesce a burst into one write; a pending flush cuts the wait short
+        deadline = time.monotonic() + LOG_WRITER_BATCH_WINDOW
+        while len(batch) < LOG_WRITER_BATCH_MAX and not isinstance(batch[-1], threading.Event):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_log_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            entries = []
+            for item in batch:
+                if isinstance(item, threading.Event):
                     continue
-                else:
-                    import traceback
-                    traceback.print_exc()
-                    break
\ No newline at end of file
+                for record in (item if isinstance(item, list) else (item,)):
+                    try:
+                        entries.append(_build_log_entry(record))
+                    except Exception as e:
+                        print(f"[ERROR] Dropping malformed download log record: {e}")
+            if entries:
+                _write_log_entries(entries)
+        except Exception as e:
+            # Never let one bad batch end the thread: flushes would wait forever
+            print(f"[ERROR] Download log writer failed on a batch: {e}")
+        finally:
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+
+def flush_download_log():
+    """Block until every queued log entry has been written to disk."""
+    if not _log_writer_thread.is_alive():
+        print("[ERROR] Download log writer is not running; entries are not being written")
+        return
+    done = threading.Event()
+    _log_queue.put(done)
+    if not done.wait(LOG_FLUSH_TIMEOUT):
+        print(f"[WARN] Download log flush timed out after {LOG_FLUSH_TIMEOUT:.0f}s")
+
+
+def _parse_log_lines(chunk: bytes, entries: List[Dict[str, Any]]):
+    for line in chunk.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entry = _log_loads(line)
+        except (UnicodeDecodeError, *_log_decode_errors):
+            continue
+        if isinstance(entry, dict):
+            entries.append(entry)
+
+
+def read_download_log() -> List[Dict[str, Any]]:
+    """Return all logged entries, oldest first, skipping corrupted lines.
+
+    Parsed entries are kept between calls and only bytes appended since the
+    previous read are parsed, so periodic history refreshes stay cheap as
+    the log grows. Treat the returned entries as read-only.
+    """
+    flush_download_log()
+    with _log_lock:
+        try:
+            st = os.stat(DOWNLOAD_LOG_FILE)
+        except OSError:
+            _log_read_cache.update(ident=None, offset=0, entries=[])
+            return []
+
+        ident = (st.st_dev, st.st_ino)
+        if _log_read_cache["ident"] != ident or st.st_size < _log_read_cache["offset"]:
+            # New, rotated or truncated file: parse it from the start
+            _log_read_cache.update(ident=ident, offset=0, entries=[])
+
+        if st.st_size > _log_read_cache["offset"]:
+            with open(DOWNLOAD_LOG_FILE, "rb") as f:
+                f.seek(_log_read_cache["offset"])
+                chunk = f.read()
+            # Leave a trailing partial line for the next read
+            end = chunk.rfind(b"\n") + 1
+            _parse_log_lines(chunk[:end], _log_read_cache["entries"])
+            _log_read_cache["offset"] += end
+
+        return list(_log_read_cache["entries"])
+
+
+def clear_download_log():
+    """Delete the download log after pending entries are flushed."""
+    flush_download_log()
+    with _log_lock:
+        _close_log_fd()
+        if os.path.exists(DOWNLOAD_LOG_FILE):
+            os.remove(DOWNLOAD_LOG_FILE)
+        _log_read_cache.update(ident=None, offset=0, entries=[])
+
+
+_migrate_legacy_download_log()
+_log_writer_thread = threading.Thread(target=_download_log_writer, name="download-log-writer", daemon=True)
+_log_writer_thread.start()
+atexit.register(flush_download_log)
+
+
+def append_download_log(username, station_id, filename, local_path, status, message):
+    """Queue a download log entry; the background writer appends it to disk
+
+    Only the raw values and the current time are queued here. Sanitizing,
+    timestamp formatting and serialization all happen on the writer thread,
+    off the download workers' path.
+    """
+    try:
+        _log_queue.put((time.time(), username, station_id, filename, local_path, status, message))
+    except Exception as e:
+        print(f"[ERROR] Download log failed: {e}")
+
+
+def append_download_logs(rows):
+    """Queue many (username, station_id, filename, local_path, status, message)
+    rows as one item, so the writer gets them in a single batch.
+    """
+    if not rows:
+        return
+    try:
+        logged_at = time.time()
+        _log_queue.put([(logged_at, *row) for row in rows])
+    except Exception as e:
+        print(f"[ERROR] Download log failed: {e}")
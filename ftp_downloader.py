@@ -1,17 +1,90 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
 from datetime import datetime, timedelta, date
 import os
 import logging
+import queue
 import ftplib
 from typing import Tuple, List, Optional
+from collections import defaultdict, deque
+from contextlib import contextmanager
+import functools
 import threading
 import re
-import json
 import time
 import socket
 
+try:
+    import aioftp  # Optional: asyncio FTP client for the download fan-out
+except ImportError:
+    aioftp = None
+
+try:
+    import uvloop  # Optional: faster event loop for the aioftp path (not on Windows)
+except ImportError:
+    uvloop = None
+
+# Re-exported: downloads log to the shared JSON Lines file written by database.py
+from database import append_download_log  # noqa: F401
+
 logger = logging.getLogger(__name__)
 
+# Receive buffer requested for every RETR/NLST data connection, so one
+# connection can keep a high bandwidth-delay link full
+FTP_DATA_RCVBUF = 4 * 1024 * 1024
+
+# Pipelined SIZE: commands sent back to back per batch, and how long to wait
+# for each reply before deciding the server does not handle pipelining
+FTP_SIZE_PIPELINE_BATCH = 100
+FTP_SIZE_PIPELINE_TIMEOUT = 5
+
+
+class TunedFTP(ftplib.FTP):
+    """ftplib.FTP with TCP_NODELAY on the control socket and a large
+    receive buffer on each data socket. Settings are applied per socket, so
+    they hold across reconnects."""
+
+    def connect(self, *args, **kwargs):
+        welcome = super().connect(*args, **kwargs)
+        try:
+            # Commands are short request/response exchanges
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass
+        return welcome
+
+    def size_many(self, names):
+        """SIZE for each name, sending all commands before reading the replies.
+
+        Returns one entry per name: the size, or None when the server refused
+        SIZE for it. Any other reply means the exchange is out of step and is
+        raised, after which the session must not be reused.
+        """
+        self.sock.sendall("".join(f"SIZE {name}\r\n" for name in names).encode(self.encoding))
+        timeout = self.sock.gettimeout()
+        self.sock.settimeout(FTP_SIZE_PIPELINE_TIMEOUT)
+        try:
+            sizes = []
+            for _ in names:
+                try:
+                    resp = self.getresp()
+                except ftplib.error_perm:
+                    sizes.append(None)
+                    continue
+                if resp[:3] != "213":
+                    raise ftplib.error_reply(resp)
+                sizes.append(int(resp[3:].strip()))
+            return sizes
+        finally:
+            self.sock.settimeout(timeout)
+
+    def ntransfercmd(self, cmd, rest=None):
+        conn, size = super().ntransfercmd(cmd, rest)
+        try:
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, FTP_DATA_RCVBUF)
+        except OSError:
+            pass
+        return conn, size
+
 
 # === Helper: Safe mkdir ===
 def safe_makedirs(path):
@@ -28,40 +101,190 @@ def ftp_connect(host, user, passwd, port=21, retries=3, timeout=30):
     for attempt in range(retries):
         ftp = None
         try:
-            ftp = ftplib.FTP()
+            ftp = TunedFTP()
             ftp.connect(host, port, timeout=timeout)
             ftp.login(user, passwd)
             
-            # ✅ CRITICAL: Set binary mode for file transfers
+            # ✅ CRITICAL: Set binary mode for file transfers.
+            # voidcmd checks the reply, so this also proves the session works.
             ftp.voidcmd('TYPE I')
             
-            # Test connection
-            ftp.pwd()
             logger.debug(f"FTP connected successfully to {host}:{port}")
             return ftp
         except socket.timeout as e:
             last_exc = e
             logger.warning(f"FTP connection timeout (attempt {attempt+1}/{retries})")
             if ftp:
-                try:
-                    ftp.quit()
-                except:
-                    pass
+                # No QUIT round trip on a connection that just failed
+                ftp.close()
             time.sleep(2 * (attempt + 1))  # Exponential backoff
         except Exception as e:
             last_exc = e
             logger.warning(f"FTP connection failed (attempt {attempt+1}/{retries}): {e}")
             if ftp:
-                try:
-                    ftp.quit()
-                except:
-                    pass
+                ftp.close()
             time.sleep(1)
     
     raise Exception(f"FTP connection failed after {retries} retries: {last_exc}")
 
 
 
+# === Per-thread persistent FTP sessions ===
+# Each worker thread keeps one logged-in session and reuses it for
+# consecutive listings/downloads on the same server instead of paying the
+# TCP + USER/PASS handshake for every file.
+_tls = threading.local()
+_sessions_lock = threading.Lock()
+_open_sessions = {}  # {threading.Thread: (ftplib.FTP, host slot semaphore)}
+
+# Errors that mean the control connection itself is unusable. A 550 from
+# cwd/nlst (error_perm) is a path problem and keeps the session alive.
+FTP_CONNECTION_ERRORS = (OSError, EOFError, ftplib.error_temp, ftplib.error_reply)
+
+# A session used within this many seconds is handed out again without a
+# NOOP probe; back-to-back files then cost no extra round trip. Older
+# sessions may have hit the server's idle timeout and are checked first.
+FTP_SESSION_PROBE_AFTER = 15.0
+
+# RETR reads the data socket in DOWNLOAD_BLOCK_SIZE chunks (one Python
+# callback each) and the local file is written through a buffer this large.
+DOWNLOAD_BLOCK_SIZE = 64 * 1024
+DOWNLOAD_WRITE_BUFFER = 1024 * 1024
+
+# Per-block and per-file progress is published to progress_callback from one
+# thread at this interval instead of from every transfer as it happens.
+PROGRESS_PUBLISH_INTERVAL = 0.05
+
+# How often a paused transfer checks whether it has been resumed
+PAUSE_POLL_INTERVAL = 0.1
+
+
+# Upper bound on simultaneous logged-in sessions against one FTP server. It
+# is shared by every download worker, since several saved servers can use one
+# host. A thread-local session holds its slot from login until it is closed;
+# an aioftp worker holds one for the life of its client.
+FTP_MAX_SESSIONS_PER_HOST = 8
+_host_semaphores = defaultdict(lambda: threading.BoundedSemaphore(FTP_MAX_SESSIONS_PER_HOST))
+_host_semaphores_lock = threading.Lock()
+
+# While waiting this long for a host slot, check for slots held by sessions
+# of threads that exited without closing them
+FTP_SLOT_WAIT = 5.0
+
+# How often an aioftp worker waiting for a host slot tries again
+FTP_SLOT_POLL_INTERVAL = 0.05
+
+
+def _host_slot(host, port):
+    """Return the semaphore bounding concurrent sessions to host:port"""
+    with _host_semaphores_lock:
+        return _host_semaphores[(host, port)]
+
+
+def _quit_quietly(ftp):
+    try:
+        ftp.quit()
+    except:
+        pass
+    finally:
+        # quit() skips close() when QUIT itself fails
+        ftp.close()
+
+
+def get_ftp_session(host, user, passwd, port=21, retries=3, timeout=30):
+    """Return this thread's FTP session for host, reconnecting only when needed"""
+    # The password is part of the key so changed credentials are re-checked
+    key = (host, port, user, passwd)
+    ftp = getattr(_tls, "ftp", None)
+    now = time.monotonic()
+    if ftp is not None:
+        if getattr(_tls, "key", None) == key:
+            if now - _tls.last_used < FTP_SESSION_PROBE_AFTER:
+                _tls.last_used = now
+                return ftp
+            try:
+                ftp.voidcmd('NOOP')
+                _tls.last_used = now
+                return ftp
+            except Exception as e:
+                logger.debug(f"Cached FTP session to {host}:{port} is dead, reconnecting: {e}")
+                close_ftp_session(graceful=False)
+        close_ftp_session()
+
+    slot = _host_slot(host, port)
+    while not slot.acquire(timeout=FTP_SLOT_WAIT):
+        close_stale_ftp_sessions()
+    try:
+        ftp = ftp_connect(host, user, passwd, port=port, retries=retries, timeout=timeout)
+    except BaseException:
+        slot.release()
+        raise
+    _tls.ftp = ftp
+    _tls.key = key
+    _tls.cwd = None
+    _tls.last_used = time.monotonic()
+    with _sessions_lock:
+        _open_sessions[threading.current_thread()] = (ftp, slot)
+    return ftp
+
+
+def ftp_session_cwd(ftp, path):
+    """Change this thread's session to path, skipping the CWD if it is already there"""
+    if getattr(_tls, "cwd", None) == path:
+        return
+    ftp.cwd(path)
+    _tls.cwd = path
+
+
+def close_ftp_session(graceful=True):
+    """Close the calling thread's cached FTP session, if any.
+
+    Error paths pass graceful=False: the socket is just closed, without
+    sending QUIT and waiting up to the timeout on a connection that may be dead.
+    """
+    ftp = getattr(_tls, "ftp", None)
+    _tls.ftp = None
+    _tls.key = None
+    _tls.cwd = None
+    with _sessions_lock:
+        session = _open_sessions.pop(threading.current_thread(), None)
+    if ftp is None:
+        return
+    try:
+        if graceful:
+            _quit_quietly(ftp)
+        else:
+            ftp.close()
+    finally:
+        if session is not None:
+            session[1].release()
+
+
+def close_stale_ftp_sessions():
+    """Close sessions left behind by worker threads that have exited"""
+    with _sessions_lock:
+        stale = [(thread, session) for thread, session in _open_sessions.items() if not thread.is_alive()]
+        for thread, _ in stale:
+            del _open_sessions[thread]
+    for _, (ftp, slot) in stale:
+        try:
+            _quit_quietly(ftp)
+        finally:
+            slot.release()
+
+
+def ftp_close_all():
+    """Close every cached FTP session (used at application shutdown)"""
+    with _sessions_lock:
+        sessions = list(_open_sessions.values())
+        _open_sessions.clear()
+    for ftp, slot in sessions:
+        try:
+            _quit_quietly(ftp)
+        finally:
+            slot.release()
+
+
 def test_ftp_connection(host: str, user: str, passwd: str, port: int = 21) -> Tuple[bool, str]:
     """Test FTP connection and return (status, message)"""
     try:
@@ -75,153 +298,15 @@ def test_ftp_connection(host: str, user: str, passwd: str, port: int = 21) -> Tu
         return False, f"Connection error: {str(e)}"
 
 
-# ===========================================================
-# WINDOWS-COMPATIBLE THREAD-SAFE LOGGING
-# ===========================================================
-
-_log_lock = threading.Lock()
-
-def append_download_log(username, station_id, filename, local_path, status, message):
-    """Thread-safe download log with Windows file locking support"""
-    log_file = "download_log.json"
-    max_retries = 5
-    retry_delay = 0.1  # 100ms between retries
-    
-    # Use global lock to prevent concurrent writes from threads
-    with _log_lock:
-        for attempt in range(max_retries):
-            try:
-                # Sanitize all inputs - remove problematic characters
-                safe_username = str(username).replace('"', "'").replace('\n', ' ').replace('\r', '').strip()
-                safe_station = str(station_id).replace('"', "'").replace('\n', ' ').replace('\r', '').strip()
-                safe_filename = str(filename).replace('"', "'").replace('\n', ' ').replace('\r', '').strip()
-                safe_path = str(local_path).replace('"', "'").replace('\n', ' ').replace('\r', '').strip()
-                safe_status = str(status).replace('"', "'").replace('\n', ' ').replace('\r', '').strip()
-                safe_message = str(message).replace('"', "'").replace('\n', ' ').replace('\r', '').strip()
-                
-                log_entry = {
-                    "username": safe_username,
-                    "station_id": safe_station,
-                    "filename": safe_filename,
-                    "local_path": safe_path,
-                    "status": safe_status,
-                    "message": safe_message,
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                
-                data = []
-                
-                # Try to read existing log with retry
-                if os.path.exists(log_file):
-                    try:
-                        with open(log_file, "r", encoding="utf-8") as f:
-                            content = f.read().strip()
-                            if content:
-                                data = json.loads(content)
-                            if not isinstance(data, list):
-                                data = []
-                    except PermissionError:
-                        # File is locked, wait and retry
-                        if attempt < max_retries - 1:
-                            time.sleep(retry_delay * (attempt + 1))
-                            continue
-                        else:
-                            print(f"[WARN] Could not read log after {max_retries} attempts")
-                            data = []
-                    except json.JSONDecodeError:
-                        # Corrupted file - backup and start fresh
-                        backup_file = f"download_log_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json.bak"
-                        try:
-                            os.rename(log_file, backup_file)
-                            print(f"[WARN] Corrupted log backed up as: {backup_file}")
-                        except:
-                            pass
-                        data = []
-                    except Exception as e:
-                        print(f"[ERROR] Error reading log: {e}")
-                        data = []
-                
-                # Append new entry
-                data.append(log_entry)
-                
-                # Keep only last 50,000 entries
-                if len(data) > 50000:
-                    data = data[-50000:]
-                
-                # Write safely using temp file with Windows-compatible approach
-                temp_file = log_file + f".tmp.{os.getpid()}.{threading.get_ident()}"
-                
-                try:
-                    # Write to temp file
-                    with open(temp_file, "w", encoding="utf-8") as f:
-                        json.dump(data, f, indent=2, ensure_ascii=False)
-                    
-                    # Try atomic replace with Windows compatibility
-                    try:
-                        # On Windows, delete first if file exists
-                        if os.path.exists(log_file):
-                            try:
-                                os.remove(log_file)
-                            except PermissionError:
-                                # File is locked, wait and retry
-                                if attempt < max_retries - 1:
-                                    time.sleep(retry_delay * (attempt + 1))
-                                    if os.path.exists(temp_file):
-                                        try:
-                                            os.remove(temp_file)
-                                        except:
-                                            pass
-                                    continue
-                                else:
-                                    raise
-                        
-                        # Rename temp to actual file
-                        os.rename(temp_file, log_file)
-                        
-                        # Success! Break out of retry loop
-                        break
-                        
-                    except Exception as rename_err:
-                        print(f"[ERROR] Failed to rename (attempt {attempt + 1}): {rename_err}")
-                        if os.path.exists(temp_file):
-                            try:
-                                os.remove(temp_file)
-                            except:
-                                pass
-                        
-                        if attempt < max_retries - 1:
-                            time.sleep(retry_delay * (attempt + 1))
-                            continue
-                        else:
-                            raise
-                    
-                except Exception as write_err:
-                    print(f"[ERROR] Failed to write log (attempt {attempt + 1}): {write_err}")
-                    if os.path.exists(temp_file):
-                        try:
-                            os.remove(temp_file)
-                        except:
-                            pass
-                    
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay * (attempt + 1))
-                        continue
-                    else:
-                        print(f"[ERROR] Download log failed after {max_retries} attempts")
-                        break
-                
-            except Exception as e:
-                print(f"[ERROR] Download log failed (attempt {attempt + 1}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay * (attempt + 1))
-                    continue
-                else:
-                    import traceback
-                    traceback.print_exc()
-                    break
+# === Helper: Parse filename to extract station_id and datetime ===
+# Pattern 1: StationID + YYMMDDHHMMSS (e.g., QSRA0004251118104500)
+_FILENAME_RE1 = re.compile(r'^([A-Z]+\d+(?:RF)?)(\d{12})')
+# Pattern 2: StationID + YYMMDDHHMMSS_timestamp (e.g., TSET0013RF251108170000_20251108170535)
+_FILENAME_RE2 = re.compile(r'^([A-Z]+\d+[A-Z]*)(\d{12})_\d+')
+# Shortest name either pattern can match: one letter, one digit, 12 digits
+_FILENAME_MIN_LEN = 14
 
 
-# === Helper: Parse filename to extract station_id and datetime ===
 def parse_filename(filename: str) -> Optional[Tuple[str, datetime]]:
     """
     Parse filename to extract station_id and datetime.
@@ -232,95 +317,388 @@ def parse_filename(filename: str) -> Optional[Tuple[str, datetime]]:
     3. TBST0003251129000000.txt -> TBST0003, 2025-11-29 00:00:00 (15-min intervals: 000000, 001500, 003000, 004500)
     """
     try:
-        # Remove extension
-        name_without_ext = filename.replace('.txt', '').replace('.TXT', '')
-        
-        # Pattern 1: StationID + YYMMDDHHMMSS (e.g., QSRA0004251118104500)
-        # Station ID can be variable length, followed by 12 digits
-        match1 = re.match(r'^([A-Z]+\d+(?:RF)?)(\d{12})', name_without_ext)
-        if match1:
-            station_id = match1.group(1)
-            date_str = match1.group(2)
-            # Parse: YYMMDDHHMMSS
-            # Note: Handles 15-minute intervals (00, 15, 30, 45 minutes)
-            try:
-                dt = datetime.strptime(date_str, '%y%m%d%H%M%S')
-                return station_id, dt
-            except ValueError:
-                # If parsing fails, might be invalid time format
-                logger.debug(f"Invalid datetime in filename {filename}: {date_str}")
-                return None
-        
-        # Pattern 2: StationID + YYMMDDHHMMSS_timestamp (e.g., TSET0013RF251108170000_20251108170535)
-        match2 = re.match(r'^([A-Z]+\d+[A-Z]*)(\d{12})_\d+', name_without_ext)
-        if match2:
-            station_id = match2.group(1)
-            date_str = match2.group(2)
-            # Parse: YYMMDDHHMMSS
-            try:
-                dt = datetime.strptime(date_str, '%y%m%d%H%M%S')
-                return station_id, dt
-            except ValueError:
-                logger.debug(f"Invalid datetime in filename {filename}: {date_str}")
-                return None
-        
-        return None
+        if len(filename) < _FILENAME_MIN_LEN:
+            return None
+
+        # Both patterns only look at the leading station ID and digits, so
+        # the extension never needs stripping. Station ID can be variable
+        # length, followed by 12 digits.
+        match = _FILENAME_RE1.match(filename) or _FILENAME_RE2.match(filename)
+        if not match:
+            return None
+
+        station_id, date_str = match.groups()
+        # Parse: YYMMDDHHMMSS
+        # Note: Handles 15-minute intervals (00, 15, 30, 45 minutes)
+        try:
+            dt = datetime.strptime(date_str, '%y%m%d%H%M%S')
+            return station_id, dt
+        except ValueError:
+            # If parsing fails, might be invalid time format
+            logger.debug("Invalid datetime in filename %s: %s", filename, date_str)
+            return None
     except Exception as e:
-        logger.debug(f"Failed to parse filename {filename}: {e}")
+        logger.debug("Failed to parse filename %s: %s", filename, e)
         return None
 
 
 # === Helper: Generate possible remote paths ===
+# Remote folder layouts seen on the servers, tried in this order
+_PATH_TEMPLATES = (
+    # Format: /ARCHIVE/2025/11/18/
+    "{base}/ARCHIVE/{y}/{m}/{d}",
+    "{base}/Archive/{y}/{m}/{d}",
+    "{base}/archive/{y}/{m}/{d}",
+
+    # Format: /rtutrg/received/2025/11/18112025/
+    "{base}/received/{y}/{m}/{dmy}",
+    "{base}/{sid}/received/{y}/{m}/{dmy}",
+
+    # Format: /archived/2025/11/18112025/
+    "{base}/archived/{y}/{m}/{dmy}",
+    "{base}/Archived/{y}/{m}/{dmy}",
+
+    # Root directory (files directly in base_dir)
+    "{base}",
+
+    # Common variations
+    "{base}/{y}/{m}/{d}",
+    "{base}/{y}/{m}/{dmy}",
+    "{base}/data/{y}/{m}/{d}",
+    "{base}/DATA/{y}/{m}/{d}",
+
+    # Station-specific folders
+    "{base}/{sid}",
+    "{base}/{sid}/{y}/{m}/{d}",
+    "{base}/{sid}/{y}/{m}/{dmy}",
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def _possible_paths(base_dir: str, station_id: str, date_obj: date) -> Tuple[str, ...]:
+    y = f"{date_obj.year:04d}"
+    m = f"{date_obj.month:02d}"
+    d = f"{date_obj.day:02d}"
+    fields = dict(base=base_dir, sid=station_id, y=y, m=m, d=d, dmy=d + m + y)
+
+    # Remove duplicates while preserving order
+    return tuple(dict.fromkeys(tpl.format_map(fields) for tpl in _PATH_TEMPLATES))
+
+
 def generate_possible_paths(base_dir: str, station_id: str, date_obj: date) -> List[str]:
     """
     Generate all possible remote paths based on your actual server structure.
+    Results are memoized per (base_dir, station_id, date).
     """
-    yyyy = date_obj.strftime("%Y")
-    mm = date_obj.strftime("%m")
-    dd = date_obj.strftime("%d")
-    ddmmyyyy = date_obj.strftime("%d%m%Y")
-    
-    paths = [
-        # Format: /ARCHIVE/2025/11/18/
-        f"{base_dir}/ARCHIVE/{yyyy}/{mm}/{dd}",
-        f"{base_dir}/Archive/{yyyy}/{mm}/{dd}",
-        f"{base_dir}/archive/{yyyy}/{mm}/{dd}",
-        
-        # Format: /rtutrg/received/2025/11/18112025/
-        f"{base_dir}/received/{yyyy}/{mm}/{ddmmyyyy}",
-        f"{base_dir}/{station_id}/received/{yyyy}/{mm}/{ddmmyyyy}",
-        
-        # Format: /archived/2025/11/18112025/
-        f"{base_dir}/archived/{yyyy}/{mm}/{ddmmyyyy}",
-        f"{base_dir}/Archived/{yyyy}/{mm}/{ddmmyyyy}",
+    return list(_possible_paths(base_dir, station_id, date_obj))
+
+
+# === Helper: Short-lived cache of remote directory listings ===
+# Stations on the same server usually share date folders (e.g. /ARCHIVE/Y/M/D),
+# so a multi-station run would otherwise repeat the same CWD + listing per station.
+FTP_LISTING_TTL = 60.0
+_listing_cache = {}  # {(host, port, user, path): (fetched_at, files, sizes)}
+_listing_cache_lock = threading.Lock()
+
+# Servers that refused MLSD; they are listed with plain NLST from then on
+_mlsd_unsupported = set()  # {(host, port)}
+# Replies meaning the server does not know or implement a command at all
+FTP_UNSUPPORTED_COMMAND_CODES = ("500", "501", "502")
+
+
+def _list_current_dir(ftp, host, port):
+    """Names in the session's current directory plus {name: size} for files.
+
+    MLSD returns names, types and sizes in one command, so downloads can skip
+    a SIZE round trip per file. Sizes are empty when the server only has NLST.
+    """
+    if (host, port) not in _mlsd_unsupported:
+        try:
+            names, sizes = [], {}
+            for name, facts in ftp.mlsd(facts=["type", "size"]):
+                kind = facts.get("type", "").lower()
+                if kind in ("cdir", "pdir"):
+                    continue
+                names.append(name)
+                if kind == "file" and facts.get("size", "").isdigit():
+                    sizes[name] = int(facts["size"])
+            return names, sizes
+        except ftplib.error_perm as e:
+            if str(e)[:3] not in FTP_UNSUPPORTED_COMMAND_CODES:
+                # e.g. 550 on this one directory; the server still has MLSD
+                raise
+            logger.debug(f"MLSD not available on {host}:{port}, using NLST: {e}")
+            _mlsd_unsupported.add((host, port))
+    return ftp.nlst(), {}
+
+
+def session_listing(host, user, passwd, port, path, timeout=30):
+    """List path on this thread's persistent session as (names, sizes)"""
+    reused = getattr(_tls, "ftp", None) is not None
+    try:
+        ftp = get_ftp_session(host, user, passwd, port=port, retries=1, timeout=timeout)
+        ftp_session_cwd(ftp, path)
+        return _list_current_dir(ftp, host, port)
+    except FTP_CONNECTION_ERRORS:
+        if not reused:
+            raise
+        # The reused session had died; retry once on a fresh one
+        close_ftp_session(graceful=False)
+        ftp = get_ftp_session(host, user, passwd, port=port, retries=1, timeout=timeout)
+        ftp_session_cwd(ftp, path)
+        return _list_current_dir(ftp, host, port)
+
+
+def cached_listing(host, user, passwd, port, path):
+    """session_listing, reusing a listing younger than FTP_LISTING_TTL"""
+    key = (host, port, user, path)
+    now = time.monotonic()
+    with _listing_cache_lock:
+        hit = _listing_cache.get(key)
+    if hit is not None and now - hit[0] < FTP_LISTING_TTL:
+        return hit[1], hit[2]
+
+    files, sizes = session_listing(host, user, passwd, port, path)
+    with _listing_cache_lock:
+        _listing_cache[key] = (time.monotonic(), files, sizes)
+        # Drop expired listings so long sessions do not accumulate them
+        for stale_key in [k for k, (t, _, _) in _listing_cache.items() if now - t >= FTP_LISTING_TTL]:
+            del _listing_cache[stale_key]
+    return files, sizes
+
+
+def invalidate_listings(host, user, port, paths):
+    """Forget cached listings of paths, so the next call lists them again"""
+    with _listing_cache_lock:
+        for path in paths:
+            _listing_cache.pop((host, port, user, path), None)
+
+
+def remote_file_size(ftp, filename):
+    """SIZE of a remote file, or None if the server cannot tell.
+
+    Errors meaning the session itself is broken are raised, not swallowed.
+    """
+    try:
+        return ftp.size(filename)
+    except FTP_CONNECTION_ERRORS:
+        raise
+    except Exception as size_err:
+        logger.debug(f"Could not get file size for {filename}: {size_err}")
+        return None
+
+
+# Servers whose replies went out of step under pipelined SIZE
+_size_pipeline_unsupported = set()  # {(host, port)}
+
+
+def prefetch_remote_sizes(host, user, passwd, port, files):
+    """{(path, name): size} for (path, name) pairs via pipelined SIZE.
+
+    Runs on this thread's session. Whatever could be fetched is returned;
+    files left out simply get a SIZE of their own when downloaded.
+    """
+    if (host, port) in _size_pipeline_unsupported:
+        return {}
+    by_path = defaultdict(list)
+    for path, name in files:
+        by_path[path].append(name)
+
+    sizes = {}
+    try:
+        ftp = get_ftp_session(host, user, passwd, port=port, retries=1)
+        # Listings leave the session in ASCII mode, where servers may refuse SIZE
+        ftp.voidcmd('TYPE I')
+        for path, names in by_path.items():
+            try:
+                ftp_session_cwd(ftp, path)
+            except ftplib.error_perm:
+                continue
+            for i in range(0, len(names), FTP_SIZE_PIPELINE_BATCH):
+                batch = names[i:i + FTP_SIZE_PIPELINE_BATCH]
+                for name, size in zip(batch, ftp.size_many(batch)):
+                    if size is not None:
+                        sizes[(path, name)] = size
+    except (ftplib.error_reply, ftplib.error_proto, ValueError) as e:
+        # Replies out of step with the pipelined commands: the server cannot
+        # take them batched, so stop trying on this host
+        logger.debug(f"Pipelined SIZE not usable on {host}:{port}: {e}")
+        _size_pipeline_unsupported.add((host, port))
+        close_ftp_session(graceful=False)
+    except Exception as e:
+        # Network, login or slot trouble says nothing about pipelining; keep
+        # what was fetched and let the workers SIZE the rest
+        logger.debug(f"Pipelined SIZE interrupted on {host}:{port}: {e}")
+        close_ftp_session(graceful=False)
+    return sizes
+
+
+def local_file_sizes(local_dir):
+    """Map file name -> size for every regular file in local_dir (one scandir pass)"""
+    sizes = {}
+    try:
+        with os.scandir(local_dir) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        sizes[entry.name] = entry.stat().st_size
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return sizes
+
+
+def _prepare_local_path(local_dir, filename, local_sizes=None):
+    """Return (local_path, already_present), deleting a 0-byte leftover first.
+
+    local_sizes is the local_file_sizes() scan of local_dir taken before the
+    downloads started; with it no per-file stat is needed.
+    """
+    local_path = os.path.join(local_dir, filename)
+    if local_sizes is not None:
+        file_size = local_sizes.get(filename)
+        if file_size is None:
+            return local_path, False
+    else:
+        os.makedirs(local_dir, exist_ok=True)
+        # One stat answers both "exists?" and "how big?"
+        try:
+            file_size = os.stat(local_path).st_size
+        except OSError:
+            return local_path, False
+
+    # Check if file already exists
+    if file_size > 0:
+        logger.info(f"⭐ Skipping (already exists): {filename}")
+        return local_path, True
+
+    # Delete 0-byte corrupted files before attempting download
+    logger.warning(f"🗑️ Deleting corrupted 0-byte file: {filename}")
+    try:
+        os.remove(local_path)
+    except Exception as del_err:
+        logger.error(f"Failed to delete corrupted file: {del_err}")
+    return local_path, False
+
+
+def _wait_while_paused(pause_event, cancel_event):
+    """Block a transfer while pause_event is set; raise if cancelled meanwhile"""
+    while pause_event.is_set():
+        # Sleeping on cancel_event itself wakes a paused transfer the moment
+        # it is cancelled, without allocating a throwaway Event per poll
+        if cancel_event is None:
+            time.sleep(PAUSE_POLL_INTERVAL)
+        elif cancel_event.wait(PAUSE_POLL_INTERVAL):
+            raise Exception("Cancelled during pause")
+
+
+def _open_download_file(local_path, file_size):
+    """Open local_path for writing, reserving file_size bytes up front.
+
+    Preallocating lets the filesystem lay the file out in one extent instead
+    of growing it block by block. The caller truncates to the bytes actually
+    written, so a short transfer still shows up as a size mismatch.
+    """
+    fd = os.open(local_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    if file_size > 0 and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, file_size)
+        except OSError:
+            # Not supported by this filesystem; plain writes still work
+            pass
+    return os.fdopen(fd, "wb", buffering=DOWNLOAD_WRITE_BUFFER)
+
+
+@contextmanager
+def _download_file(local_path, file_size):
+    """_open_download_file() as a context that deletes the file if the transfer fails.
+
+    A preallocated file is already full size, so one left behind by a
+    cancelled or broken transfer would pass as downloaded on the next run.
+    """
+    f = _open_download_file(local_path, file_size)
+    try:
+        with f:
+            yield f
+    except BaseException:
+        try:
+            os.remove(local_path)
+        except OSError as del_err:
+            logger.error(f"Failed to delete partial download {local_path}: {del_err}")
+        raise
+
+
+def _verify_downloaded_file(local_path, filename, file_size, bytes_written):
+    """Check a finished transfer and return download_one_file's (result, local_path)"""
+    # ✅ Verify file was downloaded successfully (not 0 bytes)
+    if os.path.exists(local_path):
+        actual_size = os.path.getsize(local_path)
         
-        # Root directory (files directly in base_dir)
-        f"{base_dir}",
+        # Check if file is empty
+        if actual_size == 0:
+            logger.error(f"❌ Downloaded file is 0 bytes (corrupted): {filename}")
+            logger.error(f"   Expected size: {file_size if file_size > 0 else 'unknown'}")
+            logger.error(f"   Bytes written during download: {bytes_written}")
+            logger.error(f"   This may indicate:")
+            logger.error(f"     - File is empty on FTP server")
+            logger.error(f"     - FTP transfer mode issue (ASCII vs BINARY)")
+            logger.error(f"     - Network connection interrupted")
+            logger.error(f"     - Firewall blocking data transfer")
+            
+            try:
+                os.remove(local_path)
+                logger.debug(f"   Deleted corrupted 0-byte file")
+            except:
+                pass
+            return False, local_path
         
-        # Common variations
-        f"{base_dir}/{yyyy}/{mm}/{dd}",
-        f"{base_dir}/{yyyy}/{mm}/{ddmmyyyy}",
-        f"{base_dir}/data/{yyyy}/{mm}/{dd}",
-        f"{base_dir}/DATA/{yyyy}/{mm}/{dd}",
+        # Check if size matches (if we knew the size beforehand)
+        if file_size > 0 and actual_size != file_size:
+            logger.warning(f"⚠️ File size mismatch for {filename}")
+            logger.warning(f"   Expected: {file_size} bytes, Got: {actual_size} bytes")
+            # Don't fail - file might still be valid
         
-        # Station-specific folders
-        f"{base_dir}/{station_id}",
-        f"{base_dir}/{station_id}/{yyyy}/{mm}/{dd}",
-        f"{base_dir}/{station_id}/{yyyy}/{mm}/{ddmmyyyy}",
-    ]
+        # File seems OK
+        logger.debug("✅ Downloaded: %s (%s bytes)", filename, actual_size)
     
-    # Remove duplicates while preserving order
-    return list(dict.fromkeys(paths))
+    logger.info(f"✅ Downloaded: {filename}")
+    return True, local_path
+
+
+def _log_download_error(filename, e):
+    error_str = str(e).lower()
+    
+    # Better error messages
+    if 'maximum number' in error_str or 'bind' in error_str:
+        logger.error(f"🚫 Server connection limit: {filename} (reduce concurrent downloads)")
+    elif 'timeout' in error_str:
+        logger.error(f"⏱️ Timeout: {filename}")
+    else:
+        logger.error(f"❌ Error downloading {filename}: {e}")
+
+
+def _remove_partial_download(local_path):
+    # Clean up failed download
+    if local_path and os.path.exists(local_path):
+        try:
+            # Only delete if file is 0 bytes (incomplete)
+            if os.path.getsize(local_path) == 0:
+                os.remove(local_path)
+        except:
+            pass
 
 
 # === Helper: Download one file - SIMPLIFIED (no subfolders) ===
 def download_one_file(host, user, passwd, port, remote_path, filename,
                       local_base_dir, station_id, retries, pause_event, cancel_event, db, 
-                      progress_callback=None):
+                      progress_callback=None, size_hint=None, local_sizes=None):
     """
     Download a single file from FTP server.
     All files stored directly in: local_base_dir/filename
     progress_callback: function(bytes_downloaded, total_bytes, filename) for real-time updates
+    size_hint: remote size already known from an MLSD listing; skips SIZE
+    local_sizes: scan of local_base_dir from local_file_sizes(); skips the stat
     """
     local_path = None
     try:
@@ -328,44 +706,33 @@ def download_one_file(host, user, passwd, port, remote_path, filename,
             return False, None
 
         # Store all files directly in the station folder
-        local_dir = local_base_dir
-        os.makedirs(local_dir, exist_ok=True)
-        local_path = os.path.join(local_dir, filename)
-
-        # Check if file already exists
-        if os.path.exists(local_path) and os.path.getsize(local_path) > 0:
-            logger.info(f"⭐ Skipping (already exists): {filename}")
+        local_path, already_present = _prepare_local_path(local_base_dir, filename, local_sizes)
+        if already_present:
             return True, local_path
-        
-        # Delete 0-byte corrupted files before attempting download
-        if os.path.exists(local_path):
-            file_size = os.path.getsize(local_path)
-            if file_size == 0:
-                logger.warning(f"🗑️ Deleting corrupted 0-byte file: {filename}")
-                try:
-                    os.remove(local_path)
-                except Exception as del_err:
-                    logger.error(f"Failed to delete corrupted file: {del_err}")
+        if size_hint == 0:
+            logger.warning(f"⚠️ File on server is 0 bytes (empty): {filename}")
+            return "skipped", local_path
 
-        # Connect to FTP with exponential backoff
+        # Reuse this thread's FTP session (and the host slot it holds),
+        # reconnecting with exponential backoff
         ftp = None
         for attempt in range(retries):
             try:
-                ftp = ftplib.FTP()
-                ftp.connect(host, port, timeout=30)
-                ftp.login(user, passwd)
-                
-                # ✅ CRITICAL: Set binary transfer mode
-                ftp.voidcmd('TYPE I')
-                
-                ftp.cwd(remote_path)
-                
-                # ✅ Verify connection is working
-                ftp.pwd()
+                # ftp_connect already switches the session to binary mode
+                ftp = get_ftp_session(host, user, passwd, port, retries=1)
+                ftp_session_cwd(ftp, remote_path)
+                # First command on the session, so a dead reused session
+                # fails here and is replaced by the next attempt. With a
+                # listed size there is no SIZE; get_ftp_session has
+                # already probed any session idle long enough to be stale
+                if size_hint is not None:
+                    file_size = size_hint
+                else:
+                    file_size = remote_file_size(ftp, filename)
                 break
             except Exception as e:
                 error_msg = str(e).lower()
-                
+            
                 # Check for server connection limit errors
                 if 'maximum number' in error_msg or 'too many' in error_msg or 'bind' in error_msg:
                     wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s
@@ -373,14 +740,10 @@ def download_one_file(host, user, passwd, port, remote_path, filename,
                     time.sleep(wait_time)
                 else:
                     logger.warning(f"FTP connect attempt {attempt+1} failed: {e}")
+            
+                close_ftp_session(graceful=False)
+                ftp = None
                 
-                if ftp:
-                    try:
-                        ftp.quit()
-                    except:
-                        pass
-                    ftp = None
-                    
                 if attempt == retries - 1:
                     # Log the specific error type
                     if 'maximum number' in error_msg or 'bind' in error_msg:
@@ -391,113 +754,289 @@ def download_one_file(host, user, passwd, port, remote_path, filename,
         if ftp is None:
             raise Exception("Failed to establish FTP connection")
 
-        # ✅ Get file size BEFORE download to detect empty files on server
-        try:
-            file_size = ftp.size(filename)
-            if file_size == 0:
-                logger.warning(f"⚠️ File on server is 0 bytes (empty): {filename}")
-                ftp.quit()
-                # ✅ FIX: Return as "skipped" not "failed"
-                # We'll return a special marker to distinguish from real failures
-                return "skipped", local_path
-        except Exception as size_err:
+        # ✅ File size was fetched BEFORE download to detect empty files on server
+        if file_size == 0:
+            logger.warning(f"⚠️ File on server is 0 bytes (empty): {filename}")
+            # ✅ FIX: Return as "skipped" not "failed"
+            # We'll return a special marker to distinguish from real failures
+            return "skipped", local_path
+        if file_size is None:
             # SIZE command not supported or failed - continue anyway
-            logger.debug(f"Could not get file size for {filename}: {size_err}")
             file_size = 0
 
         # Download file
-        bytes_written = [0]  # Track actual bytes written
+        bytes_written = 0  # Track actual bytes written
+    
+        with _download_file(local_path, file_size) as f:
+            # Bound once: the callback runs for every block
+            write = f.write
         
-        with open(local_path, "wb") as f:
-            # ✅ Get file size first for accurate progress
-            bytes_downloaded = [0]  # Use list to allow modification in nested function
-            
             def callback(data):
+                nonlocal bytes_written
+                if pause_event and pause_event.is_set():
+                    _wait_while_paused(pause_event, cancel_event)
+
+                if cancel_event and cancel_event.is_set():
+                    raise Exception("Download cancelled")
+            
+                write(data)
+                bytes_written += len(data)
+            
+                # ✅ REAL-TIME PROGRESS: Call progress callback immediately
+                if progress_callback and file_size > 0:
+                    progress_callback(bytes_written, file_size, filename)
+
+            if progress_callback is None and pause_event is None and cancel_event is None:
+                # Nothing to check per block: let ftplib write straight to the file
+                sink = write
+            else:
+                sink = callback
+
+            # ✅ Use RETR with binary mode. A transfer broken by the
+            # connection is resumed with REST from the bytes already in
+            # the file, on a fresh session, instead of failing the file.
+            offset = 0
+            for transfer_attempt in range(retries):
+                try:
+                    ftp.retrbinary(f"RETR {filename}", sink, blocksize=DOWNLOAD_BLOCK_SIZE,
+                                   rest=offset or None)
+                    break
+                except FTP_CONNECTION_ERRORS as e:
+                    if transfer_attempt == retries - 1 or (cancel_event and cancel_event.is_set()):
+                        raise
+                    offset = bytes_written = f.tell()
+                    logger.warning(f"🔁 Transfer of {filename} broke at {offset} bytes, resuming: {e}")
+                except ftplib.error_perm:
+                    if not offset or transfer_attempt == retries - 1:
+                        raise
+                    # REST refused by the server: start this file over
+                    logger.warning(f"🔁 Server cannot resume {filename}, downloading it again")
+                    f.seek(0)
+                    f.truncate()
+                    offset = bytes_written = 0
+                    continue
+                close_ftp_session(graceful=False)
+                time.sleep(2 ** transfer_attempt)
+                ftp = get_ftp_session(host, user, passwd, port, retries=1)
+                ftp_session_cwd(ftp, remote_path)
+            bytes_written = f.tell()
+
+            if file_size > 0:
+                # Drop any preallocated space the transfer did not fill
+                f.truncate()
+
+        return _verify_downloaded_file(local_path, filename, file_size, bytes_written)
+
+    except Exception as e:
+        # An aborted transfer leaves the control channel in an unknown
+        # state, so never hand this session to the next file
+        close_ftp_session(graceful=False)
+        _log_download_error(filename, e)
+        _remove_partial_download(local_path)
+        return False, local_path
+
+
+# === asyncio download path (used when aioftp is installed) ===
+# Each worker coroutine owns one control connection and one host slot and
+# pulls files from a shared queue, so a whole station runs on one event loop
+# instead of a thread per concurrent transfer.
+async def _aio_connect(host, user, passwd, port, timeout=30):
+    client = aioftp.Client(socket_timeout=timeout, connection_timeout=timeout)
+    try:
+        await client.connect(host, port)
+        await client.login(user, passwd)
+        # Binary mode up front, as in ftp_connect; SIZE is refused in ASCII mode
+        await client.command("TYPE I", "200")
+    except BaseException:
+        client.close()
+        raise
+    return client
+
+
+async def _aio_remote_file_size(client, filename):
+    """SIZE of a remote file, or None if the server cannot tell"""
+    try:
+        _, info = await client.command("SIZE " + filename, "213")
+        return int(info[-1].strip())
+    except (aioftp.StatusCodeError, ValueError) as size_err:
+        logger.debug(f"Could not get file size for {filename}: {size_err}")
+        return None
+
+
+async def _aio_download_one(client, filename, local_path, pause_event, cancel_event, progress_callback,
+                            size_hint=None):
+    """Async counterpart of download_one_file's transfer on an open session"""
+    if size_hint is not None:
+        file_size = size_hint
+    else:
+        file_size = await _aio_remote_file_size(client, filename)
+    if file_size == 0:
+        logger.warning(f"⚠️ File on server is 0 bytes (empty): {filename}")
+        return "skipped", local_path
+    if file_size is None:
+        # SIZE command not supported or failed - continue anyway
+        file_size = 0
+
+    # Blocks are gathered in memory and each full buffer is written from the
+    # default executor, so disk writes never stall the other transfers
+    loop = asyncio.get_running_loop()
+    pending = bytearray()
+    bytes_written = 0
+    with _download_file(local_path, file_size) as f:
+        async with client.download_stream(filename) as stream:
+            async for data in stream.iter_by_block(DOWNLOAD_BLOCK_SIZE):
                 if pause_event:
                     while pause_event.is_set():
                         if cancel_event and cancel_event.is_set():
                             raise Exception("Cancelled during pause")
-                        threading.Event().wait(0.1)
+                        await asyncio.sleep(PAUSE_POLL_INTERVAL)
 
                 if cancel_event and cancel_event.is_set():
                     raise Exception("Download cancelled")
-                
-                f.write(data)
-                bytes_written[0] += len(data)
-                bytes_downloaded[0] += len(data)
-                
-                # ✅ REAL-TIME PROGRESS: Call progress callback immediately
+
+                pending += data
+                bytes_written += len(data)
+                if len(pending) >= DOWNLOAD_WRITE_BUFFER:
+                    await loop.run_in_executor(None, f.write, pending)
+                    pending = bytearray()
+
                 if progress_callback and file_size > 0:
-                    progress_callback(bytes_downloaded[0], file_size, filename)
+                    progress_callback(bytes_written, file_size, filename)
 
-            # ✅ Use RETR with binary mode
-            ftp.retrbinary(f"RETR {filename}", callback, blocksize=8192)
+        if pending:
+            await loop.run_in_executor(None, f.write, pending)
+        if file_size > 0:
+            f.truncate()
 
-        ftp.quit()
-        
-        # ✅ Verify file was downloaded successfully (not 0 bytes)
-        if os.path.exists(local_path):
-            actual_size = os.path.getsize(local_path)
-            
-            # Check if file is empty
-            if actual_size == 0:
-                logger.error(f"❌ Downloaded file is 0 bytes (corrupted): {filename}")
-                logger.error(f"   Expected size: {file_size if file_size > 0 else 'unknown'}")
-                logger.error(f"   Bytes written during download: {bytes_written[0]}")
-                logger.error(f"   This may indicate:")
-                logger.error(f"     - File is empty on FTP server")
-                logger.error(f"     - FTP transfer mode issue (ASCII vs BINARY)")
-                logger.error(f"     - Network connection interrupted")
-                logger.error(f"     - Firewall blocking data transfer")
-                
+    return _verify_downloaded_file(local_path, filename, file_size, bytes_written)
+
+
+async def _aio_acquire_slot(slot):
+    """Take a host slot without blocking the event loop or an executor thread.
+
+    Polling keeps this cancellation safe: the task can only be cancelled
+    while sleeping, never after taking the slot and before the caller's
+    try/finally. Slots of exited threads are reclaimed as get_ftp_session does.
+    """
+    waited = 0.0
+    while not slot.acquire(blocking=False):
+        if waited >= FTP_SLOT_WAIT:
+            close_stale_ftp_sessions()
+            waited = 0.0
+        await asyncio.sleep(FTP_SLOT_POLL_INTERVAL)
+        waited += FTP_SLOT_POLL_INTERVAL
+
+
+async def _aio_download_worker(pending, host, user, passwd, port, local_dir, retries,
+                               pause_event, cancel_event, make_progress_callback, on_done, size_hints,
+                               local_sizes):
+    slot = _host_slot(host, port)
+    # The host slots are shared with the threaded downloaders
+    await _aio_acquire_slot(slot)
+    client = None
+    cwd = None
+    try:
+        while pending:
+            remote_path, filename, _ = pending.popleft()
+            if cancel_event and cancel_event.is_set():
+                on_done(filename, False, None)
+                continue
+
+            local_path, already_present = _prepare_local_path(local_dir, filename, local_sizes)
+            if already_present:
+                on_done(filename, True, local_path)
+                continue
+
+            result = False
+            for attempt in range(retries):
                 try:
-                    os.remove(local_path)
-                    logger.debug(f"   Deleted corrupted 0-byte file")
-                except:
-                    pass
-                return False, local_path
-            
-            # Check if size matches (if we knew the size beforehand)
-            if file_size > 0 and actual_size != file_size:
-                logger.warning(f"⚠️ File size mismatch for {filename}")
-                logger.warning(f"   Expected: {file_size} bytes, Got: {actual_size} bytes")
-                # Don't fail - file might still be valid
-            
-            # File seems OK
-            logger.debug(f"✅ Downloaded: {filename} ({actual_size} bytes)")
-        
-        logger.info(f"✅ Downloaded: {filename}")
-        return True, local_path
+                    if client is None:
+                        client = await _aio_connect(host, user, passwd, port)
+                        cwd = None
+                    if cwd != remote_path:
+                        await client.change_directory(remote_path)
+                        cwd = remote_path
+                    result, _ = await _aio_download_one(
+                        client, filename, local_path, pause_event, cancel_event,
+                        make_progress_callback(filename), size_hints.get((remote_path, filename))
+                    )
+                    break
+                except Exception as e:
+                    # The control channel state is unknown after a failed transfer
+                    if client is not None:
+                        client.close()
+                        client = None
+                    if (cancel_event and cancel_event.is_set()) or attempt == retries - 1:
+                        _log_download_error(filename, e)
+                        _remove_partial_download(local_path)
+                        break
+                    logger.warning(f"FTP attempt {attempt+1} failed for {filename}: {e}")
+                    await asyncio.sleep(1)
+            on_done(filename, result, local_path)
+    finally:
+        if client is not None:
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
+        slot.release()
 
-    except Exception as e:
-        error_str = str(e).lower()
-        
-        # Better error messages
-        if 'maximum number' in error_str or 'bind' in error_str:
-            logger.error(f"🚫 Server connection limit: {filename} (reduce concurrent downloads)")
-        elif 'timeout' in error_str:
-            logger.error(f"⏱️ Timeout: {filename}")
-        else:
-            logger.error(f"❌ Error downloading {filename}: {e}")
-        
-        # Clean up failed download
-        if local_path and os.path.exists(local_path):
+
+def _run_async(coro):
+    """Run coro to completion on a fresh event loop, uvloop's when installed"""
+    if uvloop is not None:
+        return uvloop.run(coro)
+    return asyncio.run(coro)
+
+
+async def _aio_download_all(files, workers, *args):
+    pending = deque(files)
+    results = await asyncio.gather(
+        *[_aio_download_worker(pending, *args) for _ in range(min(workers, len(files)))],
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Async download worker failed: {result}")
+
+
+# === Threaded download path (used without aioftp) ===
+# Long-lived worker threads pull files from a shared deque, each on its own
+# thread-local FTP session, and hand (filename, result, local_path) back on
+# a queue; result is the exception if download_one_file itself raised.
+def _thread_download_worker(pending, results, host, user, passwd, port, local_dir, retries,
+                            pause_event, cancel_event, make_progress_callback, size_hints, local_sizes):
+    try:
+        while True:
             try:
-                # Only delete if file is 0 bytes (incomplete)
-                if os.path.getsize(local_path) == 0:
-                    os.remove(local_path)
-            except:
-                pass
-        return False, local_path
+                remote_path, filename, file_station_id = pending.popleft()
+            except IndexError:
+                return
+            try:
+                result, local_path = download_one_file(
+                    host, user, passwd, port, remote_path, filename, local_dir, file_station_id,
+                    retries, pause_event, cancel_event, None,
+                    make_progress_callback(filename), size_hints.get((remote_path, filename)), local_sizes
+                )
+            except Exception as e:
+                result, local_path = e, None
+            results.put((filename, result, local_path))
+    finally:
+        # Hand the host slot back as soon as this worker runs out of files
+        close_ftp_session()
 
 
 # === Main download function - SIMPLIFIED ===
 def download_files_by_prefix(host, username=None, password=None, remote_path='/', station_id=None,
                              start_dt=None, end_dt=None, local_base='.', port=21,
-                             retries=3, pause_event=None, cancel_event=None, progress_callback=None):
+                             retries=3, pause_event=None, cancel_event=None, progress_callback=None,
+                             max_workers=None):
     """
     Download files from FTP for a given station_id and date/time range.
     All files stored directly in: local_base/station_id/date_range/filename
+    Returns (downloaded, failed, skipped): local paths fetched, names that
+    failed, and local paths of files that were already present.
+    max_workers caps the download threads, for callers running several stations at once.
     """
     total_downloaded = []
     total_failed = []
@@ -538,10 +1077,21 @@ def download_files_by_prefix(host, username=None, password=None, remote_path='/'
 
     # Collect all files to download
     all_files_to_download = []
+    remote_sizes = {}  # {(path, fname): size} when the listing came from MLSD
     skipped_existing = []
     
     cur_date = start_dt_obj.date()
 
+    # Station forms compared against every listed file, with and without RF
+    station_upper = station_id.upper()
+    station_base = station_upper.replace('RF', '')
+
+    # Directories that are not per-day (the base folder, the station folder)
+    # come up for every date. Their files are matched against the whole
+    # range on first listing, so later dates reuse the outcome instead of
+    # listing and collecting them again. {path: listing had files}
+    scanned_paths = {}
+
     while cur_date <= end_dt_obj.date():
         if cancel_event and cancel_event.is_set():
             logger.warning("🛑 Download cancelled during date scan")
@@ -554,53 +1104,57 @@ def download_files_by_prefix(host, username=None, password=None, remote_path='/'
         
         found = False
         for idx, path in enumerate(possible_paths):
+            if path in scanned_paths:
+                if scanned_paths[path]:
+                    found = True
+                    break
+                continue
             try:
-                ftp = ftp_connect(host, username, password, port=port, retries=1)
-                try:
-                    ftp.cwd(path)
-                    files = ftp.nlst()
+                files, sizes = cached_listing(host, username, password, port, path)
+                scanned_paths[path] = bool(files)
+                
+                if files:
+                    logger.info(f"✅ Found path: {path} ({len(files)} items)")
                     
-                    if files:
-                        logger.info(f"✅ Found path: {path} ({len(files)} items)")
+                    # Filter files for this station and date/time range
+                    for fname in files:
+                        if not fname.lower().endswith('.txt'):
+                            continue
                         
-                        # Filter files for this station and date/time range
-                        for fname in files:
-                            if not fname.lower().endswith('.txt'):
-                                continue
+                        # Parse filename
+                        parsed = parse_filename(fname)
+                        if parsed:
+                            file_station_id, file_dt = parsed
                             
-                            # Parse filename
-                            parsed = parse_filename(fname)
-                            if parsed:
-                                file_station_id, file_dt = parsed
-                                
-                                # Match station allowing for RF suffix
-                                station_base = station_id.upper().replace('RF', '')
-                                file_station_base = file_station_id.upper().replace('RF', '')
-                                
-                                # Check if station matches (with or without RF)
-                                if file_station_base == station_base or file_station_id.upper() == station_id.upper():
-                                    # Check if datetime is in range
-                                    if start_dt_obj <= file_dt <= end_dt_obj:
-                                        all_files_to_download.append((path, fname, file_station_id))
-                                        logger.debug(f"    ✅ Will download: {fname}")
-                                    else:
-                                        logger.debug(f"    ✗ Out of time range: {fname}")
+                            # Check if station matches (with or without RF)
+                            file_station_upper = file_station_id.upper()
+                            if file_station_upper == station_upper or file_station_upper.replace('RF', '') == station_base:
+                                # Check if datetime is in range
+                                if start_dt_obj <= file_dt <= end_dt_obj:
+                                    all_files_to_download.append((path, fname, file_station_id))
+                                    if fname in sizes:
+                                        remote_sizes[(path, fname)] = sizes[fname]
+                                    logger.debug("    ✅ Will download: %s", fname)
                                 else:
-                                    logger.debug(f"    ✗ Different station ({file_station_id} vs {station_id}): {fname}")
+                                    logger.debug("    ✗ Out of time range: %s", fname)
                             else:
-                                # If can't parse, check if filename starts with station_id
-                                if fname.upper().startswith(station_id.upper()):
-                                    all_files_to_download.append((path, fname, station_id))
-                                    logger.debug(f"    ✅ Will download: {fname}")
-                        
-                        found = True
-                        break
-                finally:
-                    try:
-                        ftp.quit()
-                    except Exception:
-                        pass
+                                logger.debug("    ✗ Different station (%s vs %s): %s", file_station_id, station_id, fname)
+                        else:
+                            # If can't parse, check if filename starts with station_id
+                            if fname.upper().startswith(station_upper):
+                                all_files_to_download.append((path, fname, station_id))
+                                if fname in sizes:
+                                    remote_sizes[(path, fname)] = sizes[fname]
+                                logger.debug("    ✅ Will download: %s", fname)
+                    
+                    found = True
+                    break
+            except FTP_CONNECTION_ERRORS as e:
+                close_ftp_session(graceful=False)
+                logger.debug(f"    ✗ Path failed: {path} - {str(e)[:50]}")
+                continue
             except Exception as e:
+                scanned_paths[path] = False
                 logger.debug(f"    ✗ Path failed: {path} - {str(e)[:50]}")
                 continue
         
@@ -609,30 +1163,38 @@ def download_files_by_prefix(host, username=None, password=None, remote_path='/'
         
         cur_date += timedelta(days=1)
 
-    # Check for existing files
+    # Check for existing files: one directory scan instead of a stat per file
+    existing_sizes = local_file_sizes(local_station_dir)
     filtered_files_to_download = []
     
     for path, fname, file_station_id in all_files_to_download:
-        local_file_path = os.path.join(local_station_dir, fname)
-        
-        if os.path.exists(local_file_path) and os.path.getsize(local_file_path) > 0:
-            skipped_existing.append(fname)
-            logger.debug(f"    ⭐ Already exists: {fname}")
+        if existing_sizes.get(fname, 0) > 0:
+            skipped_existing.append(os.path.join(local_station_dir, fname))
+            logger.debug("    ⭐ Already exists: %s", fname)
         else:
             filtered_files_to_download.append((path, fname, file_station_id))
     
     all_files_to_download = filtered_files_to_download
 
+    # Listings without MLSD sizes: ask for all of them up front, pipelined,
+    # rather than one SIZE round trip per file in the workers
+    unsized = [(path, fname) for path, fname, _ in all_files_to_download if (path, fname) not in remote_sizes]
+    if unsized:
+        remote_sizes.update(prefetch_remote_sizes(host, username, password, port, unsized))
+
+    # Scanning is done: free this thread's host slot for the transfers, which
+    # would otherwise wait on it when several stations run at once
+    close_ftp_session()
+
     if not all_files_to_download:
         if skipped_existing:
             logger.info(f"✅ All {len(skipped_existing)} files already exist locally for station {station_id}")
             logger.info(f"⭐ Skipping this station - no new files to download")
-            # ✅ Return empty lists to indicate "nothing new to download"
-            # This prevents the GUI from thinking files were "downloaded"
-            return [], []
+            # Nothing new: the present files come back as skipped, not "downloaded"
+            return [], [], skipped_existing
         else:
             logger.warning(f"⚠️ No files found for station {station_id}")
-            return [], []
+            return [], [], []
 
     total_files = len(all_files_to_download)
     logger.info(f"📦 Found {total_files} NEW files to download ({len(skipped_existing)} already exist)")
@@ -661,127 +1223,153 @@ def download_files_by_prefix(host, username=None, password=None, remote_path='/'
         max_threads = 8
         batch_update_interval = 1  # ✅ Update for every file
     
+    # More threads than host slots would only sit idle holding sessions
+    max_threads = min(max_threads, FTP_MAX_SESSIONS_PER_HOST)
+    if max_workers:
+        max_threads = min(max_threads, max_workers)
+    
     logger.info(f"🚀 Starting {max_threads} download threads...")
     logger.info(f"💡 Using conservative threading to avoid server connection limits")
     
-    # Progress tracking
-    progress_lock = threading.Lock()
+    # Progress tracking. Only the thread collecting results (the results
+    # queue loop, or the event loop) updates these; the publisher just reads them.
     downloaded_count = [0]
     failed_count = [0]
     skipped_count = [0]  # ✅ Track empty files separately
     last_update_count = [0]
     
     def update_progress_batch():
-        with progress_lock:
-            current_total = downloaded_count[0] + failed_count[0] + skipped_count[0]
-            # Update when we've processed enough files OR completed all
-            if (current_total - last_update_count[0] >= batch_update_interval) or (current_total == total_files):
-                if progress_callback:
-                    # Pass: (files_processed, total_files_in_station, status)
-                    progress_callback(current_total, total_files, "batch")
-                last_update_count[0] = current_total
-                if current_total % 100 == 0 or current_total == total_files:
-                    logger.info(
-                        f"📈 Progress: {current_total}/{total_files} files "
-                        f"({downloaded_count[0]} ✅, {failed_count[0]} ❌, {skipped_count[0]} ⭐)"
-                    )
-    
-    # Process in chunks
-    chunk_size = 2000 if total_files > 5000 else total_files
+        current_total = downloaded_count[0] + failed_count[0] + skipped_count[0]
+        # Update when we've processed enough files OR completed all
+        if (current_total - last_update_count[0] >= batch_update_interval) or (current_total == total_files):
+            if progress_callback:
+                # Pass: (files_processed, total_files_in_station, status)
+                progress_callback(current_total, total_files, "batch")
+            last_update_count[0] = current_total
+            if current_total % 100 == 0 or current_total == total_files:
+                logger.info(
+                    f"📈 Progress: {current_total}/{total_files} files "
+                    f"({downloaded_count[0]} ✅, {failed_count[0]} ❌, {skipped_count[0]} ⭐)"
+                )
     
-    for chunk_start in range(0, total_files, chunk_size):
-        chunk_end = min(chunk_start + chunk_size, total_files)
-        chunk = all_files_to_download[chunk_start:chunk_end]
+    # Transfers and completions only note the latest file; the publisher
+    # thread reports it with the current counts, so neither calls into the
+    # GUI and block callbacks take no lock
+    active_file = [None]
+    progress_stop = threading.Event()
+
+    def make_progress_callback(fname):
+        """Factory to create progress callback with correct filename"""
+        def callback(received, total, fn):
+            active_file[0] = fname
+        return callback
+
+    def publish_progress():
+        last = None
+        while not progress_stop.wait(PROGRESS_PUBLISH_INTERVAL):
+            fname = active_file[0]
+            current = (downloaded_count[0] + failed_count[0] + skipped_count[0], fname)
+            if fname is not None and current != last:
+                progress_callback(current[0], total_files, fname)
+                last = current
+
+    def record_result(filename, result, local_path):
+        if result == "skipped":
+            # Empty file on the server
+            skipped_count[0] += 1
+            logger.debug("⭐ Skipped (empty on server): %s", filename)
+        elif result == True:
+            total_downloaded.append(local_path)
+            downloaded_count[0] += 1
+            logger.debug("✅ %s", filename)
+        else:
+            # Real failure
+            total_failed.append(filename)
+            failed_count[0] += 1
+            logger.debug("❌ %s", filename)
+        active_file[0] = filename
         
-        with ThreadPoolExecutor(max_workers=max_threads) as executor:
-            futures = {}
-            for remote_path_found, filename, file_station_id in chunk:
-                # ✅ Create progress callback that updates immediately
-                def make_progress_callback(fname):
-                    """Factory to create progress callback with correct filename"""
-                    def callback(received, total, fn):
-                        with progress_lock:
-                            if progress_callback:
-                                progress_callback(
-                                    downloaded_count[0] + failed_count[0], 
-                                    total_files, 
-                                    fname
-                                )
-                    return callback
-                
-                fut = executor.submit(
-                    download_one_file, host, username, password, port,
-                    remote_path_found, filename, local_station_dir, file_station_id,
-                    retries, pause_event, cancel_event, None,
-                    make_progress_callback(filename)  # ✅ Pass progress callback
+        # Batch updates for logging and the final count
+        update_progress_batch()
+
+    publisher = None
+    if progress_callback:
+        publisher = threading.Thread(target=publish_progress, name="download-progress", daemon=True)
+        publisher.start()
+
+    try:
+        if aioftp is not None:
+            # One event loop drives max_threads concurrent transfers
+            _run_async(_aio_download_all(
+                all_files_to_download, max_threads, host, username, password, port,
+                local_station_dir, retries, pause_event, cancel_event,
+                make_progress_callback, record_result, remote_sizes, existing_sizes
+            ))
+        else:
+            pending = deque(all_files_to_download)
+            results = queue.SimpleQueue()
+            workers = [
+                threading.Thread(
+                    target=_thread_download_worker, name=f"ftp-download-{i + 1}", daemon=True,
+                    args=(pending, results, host, username, password, port, local_station_dir,
+                          retries, pause_event, cancel_event, make_progress_callback, remote_sizes,
+                          existing_sizes)
                 )
-                futures[fut] = (remote_path_found, filename)
+                for i in range(min(max_threads, total_files))
+            ]
+            for worker in workers:
+                worker.start()
 
-            for fut in as_completed(futures):
-                remote_path_found, filename = futures[fut]
-                try:
-                    result, local_path = fut.result()
-                    
-                    # ✅ UPDATE IMMEDIATELY when file completes
-                    with progress_lock:
-                        if result == True or result == "skipped":
-                            # Success or skipped (empty file)
-                            if result == "skipped":
-                                skipped_count[0] += 1
-                                logger.debug(f"⭐ Skipped (empty on server): {filename}")
-                            else:
-                                if local_path and os.path.exists(local_path):
-                                    total_downloaded.append(local_path)
-                                    downloaded_count[0] += 1
-                                    logger.debug(f"✅ {filename}")
-                                else:
-                                    total_downloaded.append(local_path)
-                                    downloaded_count[0] += 1
-                        else:
-                            # Real failure
-                            total_failed.append(filename)
-                            failed_count[0] += 1
-                            logger.debug(f"❌ {filename}")
-                        
-                        # ✅ IMMEDIATE UPDATE - Don't wait for batch
-                        current_total = downloaded_count[0] + failed_count[0] + skipped_count[0]
-                        if progress_callback:
-                            progress_callback(current_total, total_files, filename)
-                    
-                    # Also do batch updates for logging
-                    update_progress_batch()
-                    
-                except Exception as e:
-                    logger.exception(f"Thread error for {filename}")
+            for _ in range(total_files):
+                filename, result, local_path = results.get()
+                if isinstance(result, Exception):
+                    # Traceback only when debugging; a flaky server can fail thousands of files
+                    logger.warning(f"Thread error for {filename}: {result}",
+                                   exc_info=result if logger.isEnabledFor(logging.DEBUG) else False)
                     total_failed.append(filename)
-                    with progress_lock:
-                        failed_count[0] += 1
+                    failed_count[0] += 1
                     update_progress_batch()
+                else:
+                    record_result(filename, result, local_path)
+
+            for worker in workers:
+                worker.join()
+            # The worker threads have exited; release their sessions
+            close_stale_ftp_sessions()
+    finally:
+        if publisher is not None:
+            progress_stop.set()
+            publisher.join()
+
+    if total_failed:
+        # A failure may mean the file was renamed or rotated since the listing
+        failed_names = set(total_failed)
+        invalidate_listings(host, username, port,
+                            {path for path, fname, _ in all_files_to_download if fname in failed_names})
 
     logger.info(f"✅ Download complete: {len(total_downloaded)} success, {len(total_failed)} failed")
     if skipped_count[0] > 0:
         logger.info(f"⭐ Skipped {skipped_count[0]} empty files (0 bytes on server)")
     logger.info(f"📊 All files stored directly in station folder")
-    return total_downloaded, total_failed
+    return total_downloaded, total_failed, skipped_existing
 
 
 # === Get remote directory listing ===
 def get_remote_directory_listing(host: str, username: str, password: str, remote_path: str = "/", port: int = 21):
-    """List files in a remote directory"""
+    """List files in a remote directory.
+
+    Called from the GUI thread, so it uses a one-shot connection: no session
+    is left logged in on that thread, and it never waits for a host slot
+    held by the download workers.
+    """
     ftp = None
     try:
-        ftp = ftplib.FTP()
-        ftp.connect(host, port, timeout=15)
-        ftp.login(username, password)
+        ftp = ftp_connect(host, username, password, port=port, retries=1, timeout=15)
         ftp.cwd(remote_path)
-        files = ftp.nlst()
-        ftp.quit()
+        files, _ = _list_current_dir(ftp, host, port)
         return True, files, f"Listed {len(files)} items from {remote_path}"
     except Exception as e:
         return False, [], f"FTP listing failed: {str(e)}"
     finally:
-        if ftp:
-            try:
-                ftp.quit()
-            except:
-                pass
\ No newline at end of file
+        if ftp is not None:
+            _quit_quietly(ftp)
\ No newline at end of file
@@ -5,20 +5,35 @@ import threading
 import csv
 import shutil
 import logging
+import logging.handlers
+import queue
+import atexit
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, date, timedelta
-from typing import Optional, cast
-from database import DatabaseManager, append_download_log
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('ftp_downloader.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+from typing import Optional
+from database import (
+    DatabaseManager, append_download_logs, read_download_log,
+    clear_download_log, DOWNLOAD_LOG_FILE
 )
 
+# Configure logging. Download threads only enqueue records; one listener
+# thread does the file and console writes, so workers never wait on log I/O.
+_log_handlers = [
+    logging.FileHandler('ftp_downloader.log', encoding='utf-8'),
+    logging.StreamHandler()
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_record_queue = queue.SimpleQueue()
+_queue_handler = logging.handlers.QueueHandler(_log_record_queue)
+# Only the message (and any traceback) is rendered before queuing
+_queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler])
+_log_listener = logging.handlers.QueueListener(_log_record_queue, *_log_handlers)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logger = logging.getLogger(__name__)
 
 # PyQt6 imports
@@ -27,17 +42,56 @@ from PyQt6.QtWidgets import (
     QVBoxLayout, QHBoxLayout, QFormLayout, QTableWidget,
     QTableWidgetItem, QHeaderView, QMessageBox, QFileDialog, QComboBox,
     QDateEdit, QTimeEdit, QCheckBox, QTabWidget, QGroupBox, QScrollArea,
-    QSpinBox, QProgressBar, QTextEdit, QDialog, QSizePolicy, QAbstractSpinBox, QGridLayout
+    QSpinBox, QProgressBar, QTextEdit, QDialog, QSizePolicy, QAbstractSpinBox, QGridLayout,
+    QListWidget, QListWidgetItem, QTableView
+)
+from PyQt6.QtCore import (
+    Qt, QTimer, QThreadPool, QObject, QSignalBlocker, pyqtSignal, QDate, QTime,
+    QAbstractTableModel, QModelIndex
 )
-from PyQt6.QtCore import Qt, QTimer, QThread, QObject, pyqtSignal, QDate, QTime
-from PyQt6.QtGui import QIcon, QFont
+from PyQt6.QtGui import QIcon, QFont, QColor
 
 # Local imports
 from ftp_downloader import (
     download_files_by_prefix, test_ftp_connection, 
-    get_remote_directory_listing
+    get_remote_directory_listing, close_ftp_session, ftp_close_all,
+    close_stale_ftp_sessions, FTP_MAX_SESSIONS_PER_HOST
 )
 
+# Stations of one server downloaded at the same time (params['max_parallel_stations'])
+MAX_PARALLEL_STATIONS = 4
+
+# Threads kept by the window's download pool; each running server download holds one
+MAX_DOWNLOAD_WORKERS = 16
+
+# Delay that lets bursts of history refresh requests collapse into one rebuild
+HISTORY_REFRESH_DEBOUNCE_MS = 150
+
+# History rows handed to the table view per fetchMore() as the user scrolls
+HISTORY_FETCH_BATCH = 100
+
+# Minimum seconds between routine progress_updated emissions from a worker
+PROGRESS_EMIT_INTERVAL = 0.1
+
+
+# Show/Hide button of PasswordLineEdit; applied once, the text change needs no restyle
+PASSWORD_TOGGLE_STYLE = """
+QPushButton {
+    background-color: #f2f2f2;
+    border: 1px solid #cccccc;
+    border-radius: 6px;
+    padding: 4px 8px;
+    font-size: 10px;
+    color:#000000; 
+}
+QPushButton:hover {
+    background-color: #e6e6e6;
+    border-color: #999999;
+}
+QPushButton:pressed {
+    background-color: #d9d9d9;
+    border-color: #888888;
+}"""
 
 
 class PasswordLineEdit(QWidget):
@@ -55,58 +109,20 @@ class PasswordLineEdit(QWidget):
         self.line_edit.setEchoMode(QLineEdit.EchoMode.Password)
         layout.addWidget(self.line_edit)
 
-        button_style = """
-        QPushButton {
-            background-color: #f2f2f2;
-            border: 1px solid #cccccc;
-            border-radius: 6px;
-            padding: 4px 8px;
-            font-size: 10px;
-            color:#000000; 
-        }
-        QPushButton:hover {
-            background-color: #e6e6e6;
-            border-color: #999999;
-        }
-        QPushButton:pressed {
-            background-color: #d9d9d9;
-            border-color: #888888;
-        }"""
-        
         self.toggle_btn = QPushButton("Show")
-        self.toggle_btn.setStyleSheet(button_style)
+        self.toggle_btn.setStyleSheet(PASSWORD_TOGGLE_STYLE)
         self.toggle_btn.setFixedSize(30, 25)
         self.toggle_btn.setCheckable(True)
         self.toggle_btn.clicked.connect(self.toggle_visibility)
         layout.addWidget(self.toggle_btn)
     
     def toggle_visibility(self):
-        button_style = """
-        QPushButton {
-            background-color: #f2f2f2;
-            border: 1px solid #cccccc;
-            border-radius: 6px;
-            padding: 4px 8px;
-            font-size: 10px;
-            color:#000000; 
-        }
-        QPushButton:hover {
-            background-color: #e6e6e6;
-            border-color: #999999;
-        }
-        QPushButton:pressed {
-            background-color: #d9d9d9;
-            border-color: #888888;
-        }"""
-        
         if self.toggle_btn.isChecked():
             self.line_edit.setEchoMode(QLineEdit.EchoMode.Normal)
             self.toggle_btn.setText("Hide")
         else:
             self.line_edit.setEchoMode(QLineEdit.EchoMode.Password)
             self.toggle_btn.setText("Show")
-        
-        self.toggle_btn.setStyleSheet(button_style)
     
     def text(self):
         return self.line_edit.text()
@@ -124,7 +140,6 @@ class CheckboxListWidget(QWidget):
     def __init__(self, title="Items"):
         super().__init__()
         self.title = title
-        self.items = []
         self.setup_ui()
     
     def setup_ui(self):
@@ -143,83 +158,191 @@ class CheckboxListWidget(QWidget):
         self.select_all_cb.stateChanged.connect(self.toggle_select_all)
         layout.addWidget(self.select_all_cb)
 
-        # Scrollable area for items
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-
-        scroll_widget = QWidget()
-        self.items_layout = QVBoxLayout(scroll_widget)
-        self.items_layout.addStretch()
-        self.scroll_area.setWidget(scroll_widget)
+        # Items are checkable list entries rather than one QCheckBox widget
+        # each, so only the rows in view are ever painted
+        self.list_widget = QListWidget()
+        self.list_widget.setSelectionMode(QListWidget.SelectionMode.NoSelection)
+        self.list_widget.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.list_widget.itemChanged.connect(self.update_select_all_state)
 
-        layout.addWidget(self.scroll_area, stretch=1)
+        layout.addWidget(self.list_widget, stretch=1)
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+
+    @property
+    def items(self):
+        """All list entries, top to bottom"""
+        return [self.list_widget.item(row) for row in range(self.list_widget.count())]
     
     def add_item(self, text, data=None, checked=False):
-        """Add an item to the list (inserts before the bottom stretch)."""
-        cb = QCheckBox(text)
-        cb.setChecked(checked)
-        cb.setProperty("data", data)
-        cb.stateChanged.connect(self.update_select_all_state)
-        cb.setEnabled(True)
-
-        self.items.append(cb)
-        insert_index = max(0, self.items_layout.count() - 1)
-        self.items_layout.insertWidget(insert_index, cb)
+        """Add an item to the end of the list."""
+        self._insert_item(text, data, checked)
         self.update_select_all_state()
+
+    def add_items(self, entries):
+        """Add (text, data[, checked]) entries, refreshing Select All only once."""
+        self.list_widget.setUpdatesEnabled(False)
+        try:
+            for entry in entries:
+                self._insert_item(*entry)
+        finally:
+            self.list_widget.setUpdatesEnabled(True)
+        self.update_select_all_state()
+
+    def _insert_item(self, text, data=None, checked=False):
+        item = QListWidgetItem(text)
+        item.setData(Qt.ItemDataRole.UserRole, data)
+        item.setCheckState(Qt.CheckState.Checked if checked else Qt.CheckState.Unchecked)
+        self.list_widget.addItem(item)
     
     def clear_items(self):
         """Clear all items"""
-        for item in self.items:
-            item.setParent(None)
-            item.deleteLater()
-        self.items = []
-        self.select_all_cb.blockSignals(True)
-        self.select_all_cb.setChecked(False)
-        self.select_all_cb.blockSignals(False)
+        self.list_widget.clear()
+        with QSignalBlocker(self.select_all_cb):
+            self.select_all_cb.setChecked(False)
     
     def toggle_select_all(self, state):
         """Select or deselect all items when Select All checkbox is clicked."""
-        if not self.items:
+        if not self.list_widget.count():
             return
 
-        checked = (state == Qt.CheckState.Checked.value)
-        self.select_all_cb.blockSignals(True)
-        
-        for item in self.items:
-            item.blockSignals(True)
-            item.setChecked(checked)
-            item.blockSignals(False)
-
-        self.select_all_cb.blockSignals(False)
+        check_state = Qt.CheckState.Checked if state == Qt.CheckState.Checked.value else Qt.CheckState.Unchecked
+        with QSignalBlocker(self.select_all_cb), QSignalBlocker(self.list_widget):
+            for item in self.items:
+                item.setCheckState(check_state)
 
     def update_select_all_state(self):
         """Update select all checkbox state based on individual items."""
-        if not self.items:
-            self.select_all_cb.blockSignals(True)
-            self.select_all_cb.setCheckState(Qt.CheckState.Unchecked)
-            self.select_all_cb.blockSignals(False)
-            return
-
-        checked_count = sum(1 for item in self.items if item.isChecked())
-
-        self.select_all_cb.blockSignals(True)
-        if checked_count == 0:
-            self.select_all_cb.setCheckState(Qt.CheckState.Unchecked)
-        elif checked_count == len(self.items):
-            self.select_all_cb.setCheckState(Qt.CheckState.Checked)
-        else:
-            self.select_all_cb.setCheckState(Qt.CheckState.PartiallyChecked)
-        self.select_all_cb.blockSignals(False)
+        any_checked = False
+        all_checked = True
+        for row in range(self.list_widget.count()):
+            if self.list_widget.item(row).checkState() == Qt.CheckState.Checked:
+                any_checked = True
+            else:
+                all_checked = False
+            if any_checked and not all_checked:
+                # Mixed: the remaining rows cannot change the answer
+                break
+
+        with QSignalBlocker(self.select_all_cb):
+            if not any_checked:
+                # Also covers an empty list
+                self.select_all_cb.setCheckState(Qt.CheckState.Unchecked)
+            elif all_checked:
+                self.select_all_cb.setCheckState(Qt.CheckState.Checked)
+            else:
+                self.select_all_cb.setCheckState(Qt.CheckState.PartiallyChecked)
 
     def get_checked_items(self):
         """Get list of checked items with their data"""
-        return [(item.text(), item.property("data")) for item in self.items if item.isChecked()]
+        return [(item.text(), item.data(Qt.ItemDataRole.UserRole)) for item in self.items
+                if item.checkState() == Qt.CheckState.Checked]
     
     def get_checked_data(self):
         """Get list of data from checked items"""
-        return [item.property("data") for item in self.items if item.isChecked() and item.property("data") is not None]
+        return [data for _, data in self.get_checked_items() if data is not None]
+
+    def get_all_data(self):
+        """Get list of data from every item, checked or not"""
+        return [item.data(Qt.ItemDataRole.UserRole) for item in self.items
+                if item.data(Qt.ItemDataRole.UserRole) is not None]
+
+
+class HistoryModel(QAbstractTableModel):
+    """Download log entries for the History table, most recent first.
+
+    Rows reach the view HISTORY_FETCH_BATCH at a time through
+    canFetchMore()/fetchMore(), so only rows scrolled into reach are laid out.
+    """
+
+    # (header, download log key)
+    COLUMNS = (
+        ("Time", "timestamp"),
+        ("Server", "username"),
+        ("Station", "station_id"),
+        ("File", "filename"),
+        ("Status", "status"),
+        ("Message", "message"),
+    )
+    STATUS_COLORS = {"success": QColor("#2e7d32"), "failed": QColor("#c62828")}
+    LOG_FIELDS = tuple(key for _, key in COLUMNS)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._entries = []
+        self._loaded = 0
+
+    def reload(self, entries):
+        """Replace all rows with entries in a single model reset"""
+        self.beginResetModel()
+        self._entries = entries
+        self._loaded = min(len(entries), HISTORY_FETCH_BATCH)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self._entries[index.row()]
+        key = self.COLUMNS[index.column()][1]
+        if role == Qt.ItemDataRole.DisplayRole:
+            value = str(entry.get(key, "N/A"))
+            return value.upper() if key == "status" else value
+        if role == Qt.ItemDataRole.ForegroundRole and key == "status":
+            return self.STATUS_COLORS.get(str(entry.get("status", "")).lower())
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section][0]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._entries)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(HISTORY_FETCH_BATCH, len(self._entries) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def to_text(self):
+        """Every row, fetched or not, as one plain-text line each"""
+        return "\n".join(
+            f"[{e.get('timestamp', 'N/A')}] {e.get('username', 'N/A')} | {e.get('station_id', 'N/A')} | "
+            f"{e.get('filename', 'N/A')} | {str(e.get('status', 'N/A')).upper()} | {e.get('message', 'N/A')}"
+            for e in self._entries
+        )
+
+
+class ProgressThrottle:
+    """Forward progress to a signal at most once per PROGRESS_EMIT_INTERVAL.
+
+    Updates arriving sooner are dropped, so per-file progress does not flood
+    the GUI event loop. Pass force=True for updates that must be shown.
+    """
+
+    def __init__(self, signal, interval=PROGRESS_EMIT_INTERVAL):
+        self.signal = signal
+        self.interval = interval
+        self._last_emit = 0.0
+        self._lock = threading.Lock()
+
+    def emit(self, *args, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_emit < self.interval:
+                return
+            self._last_emit = now
+        self.signal.emit(*args)
 
 
 class DownloadWorker(QObject):
@@ -237,10 +360,8 @@ class DownloadWorker(QObject):
         self.pause_event = threading.Event()
         self.cancel_event = threading.Event()
         self.is_running = False
-        self._thread = None
-
-    def set_thread(self, thread: QThread):
-        self._thread = thread
+        # Set when run() has returned, so a replaced worker can be waited for
+        self.done_event = threading.Event()
 
     def run(self):
         """Run the download process with accurate progress tracking"""
@@ -257,15 +378,32 @@ class DownloadWorker(QObject):
             self.log_message.emit("Starting download...")
             self.progress_updated.emit(server_info, "Initializing...", 0, 0, 0, "")
 
-            for station_index, station in enumerate(self.stations, 1):
+            station_count = len(self.stations)
+            progress = ProgressThrottle(self.progress_updated)
+            # Bound once for the per-file loops below
+            cancel_is_set = self.cancel_event.is_set
+            emit_progress = progress.emit
+            emit_log = self.log_message.emit
+            basename = os.path.basename
+            safe_username = self.server_config.get('username') or "system"
+            parallel_stations = max(1, min(
+                int(self.params.get('max_parallel_stations', MAX_PARALLEL_STATIONS)),
+                station_count
+            ))
+            # Stations running together split the per-host session cap between them
+            station_threads = max(1, FTP_MAX_SESSIONS_PER_HOST // parallel_stations)
+            # Files processed so far by stations still downloading. Every key
+            # exists up front, so the station threads never resize the dict.
+            in_flight = {station: 0 for station in self.stations}
+
+            def download_station(station_index, station):
+                """Download one station on a station pool thread"""
                 if self.cancel_event.is_set():
-                    self.log_message.emit("Download cancelled by user")
-                    break
+                    return [], [], []
 
-                station_status = f"Processing station {station_index}/{len(self.stations)}: {station}"
                 self.progress_updated.emit(
                     server_info, 
-                    station_status, 
+                    f"Processing station {station_index}/{station_count}: {station}", 
                     cumulative_total if cumulative_total > 0 else cumulative_downloaded + cumulative_failed,
                     cumulative_downloaded, 
                     cumulative_failed, 
@@ -273,135 +411,158 @@ class DownloadWorker(QObject):
                 )
                 self.log_message.emit(f"📂 Processing station: {station}")
 
+                station_label = f"Station {station_index}/{station_count}: {station}"
+
                 # ✅ Create progress callback for real-time updates
                 def station_progress_callback(processed, total, current_file):
                     """Real-time progress callback during file download"""
-                    self.progress_updated.emit(
+                    in_flight[station] = processed
+                    progress.emit(
                         server_info,
-                        f"Station {station_index}/{len(self.stations)}: {station}",
+                        station_label,
                         cumulative_total if cumulative_total > 0 else processed,
-                        cumulative_downloaded + processed,
+                        cumulative_downloaded + sum(in_flight.values()),
                         cumulative_failed,
                         current_file
                     )
 
-                try:
-                    downloaded, failed = download_files_by_prefix(
-                        host=self.server_config['host'],
-                        username=self.server_config['username'],
-                        password=self.server_config['password'],
-                        remote_path=self.server_config.get('remote_path', '/'),
-                        station_id=station,
-                        start_dt=self.params['start_dt'],
-                        end_dt=self.params['end_dt'],
-                        local_base=self.params['local_folder'],
-                        port=self.server_config['port'],
-                        retries=3,
-                        pause_event=self.pause_event,
-                        cancel_event=self.cancel_event,
-                        progress_callback=station_progress_callback  # ✅ Pass callback
-                    )
+                return download_files_by_prefix(
+                    host=self.server_config['host'],
+                    username=self.server_config['username'],
+                    password=self.server_config['password'],
+                    remote_path=self.server_config.get('remote_path', '/'),
+                    station_id=station,
+                    start_dt=self.params['start_dt'],
+                    end_dt=self.params['end_dt'],
+                    local_base=self.params['local_folder'],
+                    port=self.server_config['port'],
+                    retries=3,
+                    pause_event=self.pause_event,
+                    cancel_event=self.cancel_event,
+                    progress_callback=station_progress_callback,  # ✅ Pass callback
+                    max_workers=station_threads
+                )
+
+            # Results are handled here, one station at a time, so only this
+            # thread updates the cumulative counters
+            with ThreadPoolExecutor(max_workers=parallel_stations) as executor:
+                futures = {
+                    executor.submit(download_station, station_index, station): (station_index, station)
+                    for station_index, station in enumerate(self.stations, 1)
+                }
+                for future in as_completed(futures):
+                    if cancel_is_set():
+                        emit_log("Download cancelled by user")
+                        for pending in futures:
+                            pending.cancel()
+                        break
+
+                    station_index, station = futures[future]
+                    station_status = f"Processing station {station_index}/{station_count}: {station}"
+                    in_flight[station] = 0
+
+                    try:
+                        downloaded, failed, skipped = future.result()
                     
-                    # ✅ FIX: Check if this station had NO NEW files to download
-                    if len(downloaded) > 0 and len(failed) == 0:
-                        # Check if these are "already existed" files (returned as successful but not actually downloaded)
-                        # The download function returns existing files in the downloaded list
-                        
-                        # Check if any actual downloads happened by checking if files are new
-                        all_files_existed = all(os.path.exists(f) for f in downloaded if f)
-                        
-                        if all_files_existed:
-                            # All files already existed - count as skipped, not downloaded
-                            skipped_count = len(downloaded)
-                            cumulative_skipped += skipped_count
+                        # ✅ Files already present locally are reported separately
+                        if skipped:
+                            cumulative_skipped += len(skipped)
+                            emit_log(f"⭐ Station {station}: {len(skipped)} files already exist (skipped)")
                             
-                            self.log_message.emit(f"⭐ Station {station}: {skipped_count} files already exist (skipped)")
-                            
-                            # Don't add to cumulative_total since these aren't "new" files to process
-                            continue
+                            if not downloaded and not failed:
+                                # Don't add to cumulative_total since these aren't "new" files to process
+                                continue
                     
-                except Exception as e:
-                    error_msg = f"Error downloading from station {station}: {str(e)}"
-                    self.log_message.emit(error_msg)
-                    print(f"[ERROR] {error_msg}")
-                    downloaded, failed = [], [f"Station {station}: {str(e)}"]
-
-                # Update cumulative total after processing this station
-                station_files = len(downloaded) + len(failed)
-                cumulative_total += station_files
+                    except Exception as e:
+                        error_msg = f"Error downloading from station {station}: {str(e)}"
+                        emit_log(error_msg)
+                        logger.error("%s", error_msg)
+                        downloaded, failed = [], [f"Station {station}: {str(e)}"]
+
+                    # Update cumulative total after processing this station
+                    station_files = len(downloaded) + len(failed)
+                    cumulative_total += station_files
                 
-                self.log_message.emit(f"📊 Station {station}: {len(downloaded)} success, {len(failed)} failed")
+                    emit_log(f"📊 Station {station}: {len(downloaded)} success, {len(failed)} failed")
 
-                # Process downloaded files
-                for file_path in downloaded:
-                    try:
-                        if self.cancel_event.is_set():
-                            break
+                    log_rows = []
+
+                    # Process downloaded files
+                    for file_path in downloaded:
+                        try:
+                            if cancel_is_set():
+                                break
                             
-                        filename = os.path.basename(file_path)
-                        safe_username = self.server_config.get('username') or "system"
+                            filename = basename(file_path)
                         
-                        cumulative_downloaded += 1
+                            cumulative_downloaded += 1
                         
-                        # Update progress with accurate totals
-                        self.progress_updated.emit(
-                            server_info, 
-                            station_status,
-                            cumulative_total,
-                            cumulative_downloaded,
-                            cumulative_failed,
-                            filename
-                        )
+                            # Update progress with accurate totals
+                            emit_progress(
+                                server_info, 
+                                station_status,
+                                cumulative_total,
+                                cumulative_downloaded,
+                                cumulative_failed,
+                                filename
+                            )
                         
-                        try:
-                            from database import append_download_log
-                            append_download_log(
+                            log_rows.append((
                                 safe_username, station, filename, file_path,
                                 'success', 'Downloaded successfully'
-                            )
-                        except Exception as log_err:
-                            print(f"[WARN] Log write failed for {filename}: {log_err}")
+                            ))
                         
-                        self.log_message.emit(f"✅ {filename}")
+                            emit_log(f"✅ {filename}")
                         
-                    except Exception as file_err:
-                        print(f"[ERROR] Error processing downloaded file: {file_err}")
-                        continue
+                        except Exception as file_err:
+                            logger.error("Error processing downloaded file: %s", file_err)
+                            continue
 
-                # Process failed files
-                for failed_file in failed:
-                    try:
-                        if self.cancel_event.is_set():
-                            break
+                    # Process failed files
+                    for failed_file in failed:
+                        try:
+                            if cancel_is_set():
+                                break
                             
-                        safe_username = self.server_config.get('username') or "system"
-                        
-                        cumulative_failed += 1
+                            cumulative_failed += 1
                         
-                        # Update progress with accurate totals
-                        self.progress_updated.emit(
-                            server_info,
-                            station_status,
-                            cumulative_total,
-                            cumulative_downloaded,
-                            cumulative_failed,
-                            failed_file
-                        )
+                            # Update progress with accurate totals
+                            emit_progress(
+                                server_info,
+                                station_status,
+                                cumulative_total,
+                                cumulative_downloaded,
+                                cumulative_failed,
+                                failed_file
+                            )
                         
-                        try:
-                            from database import append_download_log
-                            append_download_log(
+                            log_rows.append((
                                 safe_username, station, failed_file, '',
                                 'failed', 'Download failed'
-                            )
-                        except Exception as log_err:
-                            print(f"[WARN] Log write failed for {failed_file}: {log_err}")
+                            ))
                         
-                        self.log_message.emit(f"✗ {failed_file}")
+                            emit_log(f"✗ {failed_file}")
                         
-                    except Exception as file_err:
-                        print(f"[ERROR] Error processing failed file: {file_err}")
-                        continue
+                        except Exception as file_err:
+                            logger.error("Error processing failed file: %s", file_err)
+                            continue
+
+                    # Show the station's final counts, whatever the throttle dropped
+                    emit_progress(
+                        server_info,
+                        station_status,
+                        cumulative_total,
+                        cumulative_downloaded,
+                        cumulative_failed,
+                        "",
+                        force=True
+                    )
+
+                    # The station's history entries go to the log writer in one hand-off
+                    append_download_logs(log_rows)
+
+            # Station pool threads have exited; drop their FTP sessions
+            close_stale_ftp_sessions()
 
             # ✅ FIX: Better final status message
             if cumulative_total == 0 and cumulative_skipped > 0:
@@ -439,16 +600,17 @@ class DownloadWorker(QObject):
 
         except Exception as e:
             error_msg = f"Critical error in download worker: {str(e)}"
-            print(f"[CRITICAL] {error_msg}")
-            import traceback
-            traceback.print_exc()
+            logger.critical("%s", error_msg, exc_info=True)
             
             self.progress_updated.emit(server_info, f"Error: {str(e)}", 0, 0, 0, "")
             self.log_message.emit(error_msg)
             self.finished.emit(server_info, 0, 0)
         finally:
+            # Release the FTP session this worker thread kept open for scanning
+            close_ftp_session()
             self.is_running = False
             self.log_message.emit("Worker thread finished")
+            self.done_event.set()
    
     def pause(self):
         self.pause_event.set()
@@ -482,14 +644,12 @@ class RetryDownloadWorker(QObject):
         self.pause_event = threading.Event()
         self.cancel_event = threading.Event()
         self.is_running = False
-        self._thread = None
+        # Set when run() has returned, so a replaced worker can be waited for
+        self.done_event = threading.Event()
         self.total_files = sum(len(files) for files in retry_files_dict.values())
         self.downloaded_count = 0
         self.failed_count = 0
 
-    def set_thread(self, thread: QThread):
-        self._thread = thread
-
     def run(self):
         """Run the download process with comprehensive error handling"""
         self.is_running = True
@@ -503,14 +663,31 @@ class RetryDownloadWorker(QObject):
             self.log_message.emit("Starting download...")
             self.progress_updated.emit(server_info, "Scanning for files...", 0, 0, 0, "")
 
-            for station_index, station in enumerate(self.stations, 1):
+            station_count = len(self.stations)
+            progress = ProgressThrottle(self.progress_updated)
+            # Bound once for the per-file loops below
+            cancel_is_set = self.cancel_event.is_set
+            emit_progress = progress.emit
+            emit_log = self.log_message.emit
+            basename = os.path.basename
+            safe_username = self.server_config.get('username') or "system"
+            parallel_stations = max(1, min(
+                int(self.params.get('max_parallel_stations', MAX_PARALLEL_STATIONS)),
+                station_count
+            ))
+            station_threads = max(1, FTP_MAX_SESSIONS_PER_HOST // parallel_stations)
+
+            def progress_callback(received, total, filename):
+                pass
+
+            def download_station(station_index, station):
+                """Download one station on a station pool thread"""
                 if self.cancel_event.is_set():
-                    self.log_message.emit("Download cancelled by user")
-                    break
+                    return [], [], []
 
                 self.progress_updated.emit(
                     server_info, 
-                    f"Processing station {station_index}/{len(self.stations)}: {station}", 
+                    f"Processing station {station_index}/{station_count}: {station}", 
                     self.total_files if self.total_files > 0 else total_downloaded + total_failed,
                     total_downloaded, 
                     total_failed, 
@@ -518,130 +695,153 @@ class RetryDownloadWorker(QObject):
                 )
                 self.log_message.emit(f"📂 Processing station: {station}")
 
-                def progress_callback(received, total, filename):
-                    pass
+                return download_files_by_prefix(
+                    host=self.server_config['host'],
+                    username=self.server_config['username'],
+                    password=self.server_config['password'],
+                    remote_path=self.server_config.get('remote_path', '/'),
+                    station_id=station,
+                    start_dt=self.params['start_dt'],
+                    end_dt=self.params['end_dt'],
+                    local_base=self.params['local_folder'],
+                    port=self.server_config['port'],
+                    retries=3,
+                    pause_event=self.pause_event,
+                    cancel_event=self.cancel_event,
+                    progress_callback=progress_callback,
+                    max_workers=station_threads
+                )
 
-                try:
-                    downloaded, failed = download_files_by_prefix(
-                        host=self.server_config['host'],
-                        username=self.server_config['username'],
-                        password=self.server_config['password'],
-                        remote_path=self.server_config.get('remote_path', '/'),
-                        station_id=station,
-                        start_dt=self.params['start_dt'],
-                        end_dt=self.params['end_dt'],
-                        local_base=self.params['local_folder'],
-                        port=self.server_config['port'],
-                        retries=3,
-                        pause_event=self.pause_event,
-                        cancel_event=self.cancel_event,
-                        progress_callback=progress_callback
-                    )
+            with ThreadPoolExecutor(max_workers=parallel_stations) as executor:
+                futures = {
+                    executor.submit(download_station, station_index, station): (station_index, station)
+                    for station_index, station in enumerate(self.stations, 1)
+                }
+                for future in as_completed(futures):
+                    if cancel_is_set():
+                        emit_log("Download cancelled by user")
+                        for pending in futures:
+                            pending.cancel()
+                        break
+
+                    station_index, station = futures[future]
+                    station_label = f"Station {station_index}/{station_count}: {station}"
+
+                    try:
+                        downloaded, failed, skipped = future.result()
                     
-                    # ✅ FIX: Check if station was skipped (all files already exist)
-                    if len(downloaded) > 0 and len(failed) == 0:
-                        # Check if these are "fake" downloads (files that already existed)
-                        # If all files already existed, the function returns them as "downloaded"
-                        station_files = len(downloaded)
-                        self.total_files += station_files
-                        total_downloaded += station_files
-                        
-                        self.log_message.emit(f"✅ Station {station}: {station_files} files (already existed locally)")
-                        
-                        # Update progress to show we're done with this station
-                        self.progress_updated.emit(
-                            server_info,
-                            f"Station {station_index}/{len(self.stations)}: Complete",
-                            self.total_files,
-                            total_downloaded,
-                            total_failed,
-                            ""
-                        )
+                        # ✅ Files already present locally count as retrieved
+                        if skipped:
+                            station_files = len(skipped)
+                            self.total_files += station_files
+                            total_downloaded += station_files
                         
-                        # ✅ SKIP the file-by-file processing - files already exist!
-                        continue
+                            emit_log(f"✅ Station {station}: {station_files} files (already existed locally)")
                         
-                    elif len(downloaded) == 0 and len(failed) == 0:
-                        # No files found at all for this station
-                        self.log_message.emit(f"⚠️  Station {station}: No files found")
-                        continue
+                        if not downloaded and not failed:
+                            if skipped:
+                                # Update progress to show we're done with this station
+                                self.progress_updated.emit(
+                                    server_info,
+                                    f"Station {station_index}/{station_count}: Complete",
+                                    self.total_files,
+                                    total_downloaded,
+                                    total_failed,
+                                    ""
+                                )
+                            else:
+                                # No files found at all for this station
+                                emit_log(f"⚠️  Station {station}: No files found")
+                            
+                            # ✅ SKIP the file-by-file processing - nothing new was fetched
+                            continue
                     
-                    # ✅ Update total files count progressively (only for NEW downloads)
-                    station_files = len(downloaded) + len(failed)
-                    self.total_files += station_files
+                        # ✅ Update total files count progressively (only for NEW downloads)
+                        station_files = len(downloaded) + len(failed)
+                        self.total_files += station_files
                     
-                except Exception as e:
-                    error_msg = f"Error downloading from station {station}: {str(e)}"
-                    self.log_message.emit(error_msg)
-                    print(f"[ERROR] {error_msg}")
-                    downloaded, failed = [], [f"Station {station}: {str(e)}"]
+                    except Exception as e:
+                        error_msg = f"Error downloading from station {station}: {str(e)}"
+                        emit_log(error_msg)
+                        logger.error("%s", error_msg)
+                        downloaded, failed = [], [f"Station {station}: {str(e)}"]
 
-                # Process downloaded files with error handling
-                for file_path in downloaded:
-                    try:
-                        if self.cancel_event.is_set():
-                            break
+                    log_rows = []
+
+                    # Process downloaded files with error handling
+                    for file_path in downloaded:
+                        try:
+                            if cancel_is_set():
+                                break
                             
-                        filename = os.path.basename(file_path)
-                        safe_username = self.server_config.get('username') or "system"
+                            filename = basename(file_path)
                         
-                        total_downloaded += 1
+                            total_downloaded += 1
                         
-                        self.progress_updated.emit(
-                            server_info, 
-                            f"Station {station_index}/{len(self.stations)}: {station}",
-                            self.total_files,
-                            total_downloaded,
-                            total_failed,
-                            filename
-                        )
+                            emit_progress(
+                                server_info, 
+                                station_label,
+                                self.total_files,
+                                total_downloaded,
+                                total_failed,
+                                filename
+                            )
                         
-                        try:
-                            append_download_log(
+                            log_rows.append((
                                 safe_username, station, filename, file_path,
                                 'success', 'Downloaded successfully'
-                            )
-                        except Exception as log_err:
-                            print(f"[WARN] Log write failed for {filename}: {log_err}")
+                            ))
                         
-                        self.log_message.emit(f"✓ {filename}")
+                            emit_log(f"✓ {filename}")
                         
-                    except Exception as file_err:
-                        print(f"[ERROR] Error processing downloaded file: {file_err}")
-                        continue
+                        except Exception as file_err:
+                            logger.error("Error processing downloaded file: %s", file_err)
+                            continue
 
-                # Process failed files with error handling
-                for failed_file in failed:
-                    try:
-                        if self.cancel_event.is_set():
-                            break
+                    # Process failed files with error handling
+                    for failed_file in failed:
+                        try:
+                            if cancel_is_set():
+                                break
                             
-                        safe_username = self.server_config.get('username') or "system"
+                            total_failed += 1
                         
-                        total_failed += 1
-                        
-                        self.progress_updated.emit(
-                            server_info,
-                            f"Station {station_index}/{len(self.stations)}: {station}",
-                            self.total_files,
-                            total_downloaded,
-                            total_failed,
-                            failed_file
-                        )
+                            emit_progress(
+                                server_info,
+                                station_label,
+                                self.total_files,
+                                total_downloaded,
+                                total_failed,
+                                failed_file
+                            )
                         
-                        try:
-                            append_download_log(
+                            log_rows.append((
                                 safe_username, station, failed_file, '',
                                 'failed', 'Download failed'
-                            )
-                        except Exception as log_err:
-                            print(f"[WARN] Log write failed for {failed_file}: {log_err}")
+                            ))
                         
-                        self.log_message.emit(f"✗ {failed_file}")
+                            emit_log(f"✗ {failed_file}")
                         
-                    except Exception as file_err:
-                        print(f"[ERROR] Error processing failed file: {file_err}")
-                        continue
+                        except Exception as file_err:
+                            logger.error("Error processing failed file: %s", file_err)
+                            continue
+
+                    # Show the station's final counts, whatever the throttle dropped
+                    emit_progress(
+                        server_info,
+                        station_label,
+                        self.total_files,
+                        total_downloaded,
+                        total_failed,
+                        "",
+                        force=True
+                    )
+
+                    # The station's history entries go to the log writer in one hand-off
+                    append_download_logs(log_rows)
+
+            # Station pool threads have exited; drop their FTP sessions
+            close_stale_ftp_sessions()
 
             # Final progress update
             self.progress_updated.emit(
@@ -660,16 +860,17 @@ class RetryDownloadWorker(QObject):
 
         except Exception as e:
             error_msg = f"Critical error in download worker: {str(e)}"
-            print(f"[CRITICAL] {error_msg}")
-            import traceback
-            traceback.print_exc()
+            logger.critical("%s", error_msg, exc_info=True)
             
             self.progress_updated.emit(server_info, f"Error: {str(e)}", 0, 0, 0, "")
             self.log_message.emit(error_msg)
             self.finished.emit(server_info, 0, 0)
         finally:
+            # Release the FTP session this worker thread kept open for scanning
+            close_ftp_session()
             self.is_running = False
             self.log_message.emit("Worker thread finished")
+            self.done_event.set()
 
     def pause(self):
         self.pause_event.set()
@@ -709,11 +910,27 @@ class FTPDownloaderGUI(QMainWindow):
     def __init__(self, db_manager):
         super().__init__()
         self.download_workers = {}
-        self.download_threads = {}
+        # Workers run on pooled threads that are reused between downloads
+        self.download_pool = QThreadPool(self)
+        self.download_pool.setMaxThreadCount(MAX_DOWNLOAD_WORKERS)
         self.selected_username = None
         self.current_username = None
         self.db_manager = db_manager
         self.stations_list = CheckboxListWidget("")
+        # Server tabs whose widgets are built on first view:
+        # {ServerWidget: (server, prefetched settings)}
+        self._pending_server_tabs = {}
+        # Main tab ServerWidget per server username, kept by refresh_main_tabs()
+        self._server_widgets = {}
+
+        # refresh_history() calls landing within HISTORY_REFRESH_DEBOUNCE_MS
+        # (filter changes, the periodic timer) collapse into one rebuild
+        self._history_refresh_timer = QTimer(self)
+        self._history_refresh_timer.setSingleShot(True)
+        self._history_refresh_timer.setInterval(HISTORY_REFRESH_DEBOUNCE_MS)
+        self._history_refresh_timer.timeout.connect(self._do_refresh_history)
+        # (entry count, last entry, filters) of the text currently shown
+        self._history_view_key = None
         
         self.init_database()
         
@@ -723,49 +940,73 @@ class FTPDownloaderGUI(QMainWindow):
             
             # Auto-refresh history timer
             self.history_timer = QTimer()
-            self.history_timer.timeout.connect(self.refresh_history)
+            self.history_timer.timeout.connect(self._refresh_visible_history)
             self.history_timer.start(2000)
         else:
             self.show_database_error()
 
-    def safe_cleanup_worker(self, username):
-        """Safely clean up worker and thread"""
+    def safe_cleanup_worker(self, username, timeout=0.1):
+        """Cancel a server's worker without blocking the UI on its exit.
+
+        Returns True once no worker for username is left running. A worker
+        still stopping after timeout (e.g. blocked in a socket read) stays
+        registered and False is returned: a replacement must not start yet,
+        since both would write the same station files.
+        """
         try:
-            if username in self.download_workers:
-                worker = self.download_workers[username]
-                try:
-                    worker.stop()
-                    print(f"[INFO] Stopped worker for {username}")
-                except Exception as e:
-                    print(f"[WARN] Error stopping worker: {e}")
-                
+            worker = self.download_workers.get(username)
+            if worker is None:
+                return True
+            try:
+                worker.stop()
+                # A finished worker returns at once; a running one notices
+                # cancel_event at its next chunk and exits on its own
+                if not worker.done_event.wait(timeout):
+                    print(f"[INFO] Worker {username} is still stopping in the background")
+                    return False
                 del self.download_workers[username]
-            
-            if username in self.download_threads:
-                thread = self.download_threads[username]
-                try:
-                    if thread.isRunning():
-                        thread.quit()
-                        if not thread.wait(3000):  # Wait 3 seconds
-                            print(f"[WARN] Thread {username} did not stop gracefully, terminating...")
-                            thread.terminate()
-                            thread.wait()
-                    print(f"[INFO] Stopped thread for {username}")
-                except Exception as e:
-                    print(f"[WARN] Error stopping thread: {e}")
-                
-                del self.download_threads[username]
+                # Nothing queued from the old worker may reach the next one's UI
+                for signal in (worker.progress_updated, worker.finished, worker.log_message):
+                    try:
+                        signal.disconnect()
+                    except TypeError:
+                        pass
+                print(f"[INFO] Stopped worker for {username}")
+                return True
+            except Exception as e:
+                print(f"[WARN] Error stopping worker: {e}")
+                return worker.done_event.is_set()
                 
         except Exception as e:
             print(f"[ERROR] Cleanup failed for {username}: {e}")
+            return False
+
+    def warn_worker_stopping(self, username):
+        """Tell the user a new download waits for the previous one to exit"""
+        QMessageBox.warning(
+            self,
+            "Download In Progress",
+            f"The previous download for {username} is still stopping.\n\n"
+            "Please try again in a moment."
+        )
             
     def get_server_widget(self, server_name: str) -> Optional["ServerWidget"]:
         """Return the ServerWidget instance matching the given server name."""
-        for i in range(self.server_tabs.count()):
-            if self.server_tabs.tabText(i) == server_name:
-                widget = self.server_tabs.widget(i)
-                return cast(ServerWidget, widget)
-        return None
+        widget = self._server_widgets.get(server_name)
+        if widget is not None:
+            self._build_server_tab(widget)
+        return widget
+
+    def _build_server_tab(self, widget):
+        """Build a server tab's contents if it has not been shown yet"""
+        pending = self._pending_server_tabs.pop(widget, None)
+        if pending is not None:
+            server, settings = pending
+            self.create_server_main_tab(server, widget, settings)
+
+    def on_server_tab_changed(self, index):
+        """Build a server tab the first time it is shown"""
+        self._build_server_tab(self.server_tabs.widget(index))
 
     def init_database(self):
         """Initialize database with error handling"""
@@ -849,6 +1090,22 @@ class FTPDownloaderGUI(QMainWindow):
                 border: 1px solid #ccc;
                 border-radius: 3px;
             }
+            /* Button-less spin boxes, e.g. the server port and auto-download time */
+            QAbstractSpinBox[role="compactSpin"] {
+                padding: 6px 8px;
+                font-size: 13px;
+                border: 1px solid #ccc;
+                border-radius: 3px;
+                background-color: white;
+            }
+            QAbstractSpinBox[role="compactSpin"]:focus {
+                border: 1px solid #4CAF50;
+            }
+            QAbstractSpinBox[role="compactSpin"]::up-button,
+            QAbstractSpinBox[role="compactSpin"]::down-button {
+                width: 0px;
+                border: none;
+            }
         """)
         
         central_widget = QWidget()
@@ -908,22 +1165,7 @@ class FTPDownloaderGUI(QMainWindow):
         self.server_port_edit.setValue(21)
         self.server_port_edit.setFixedWidth(100)
         self.server_port_edit.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        self.server_port_edit.setStyleSheet("""
-            QSpinBox {
-                padding: 6px 8px;
-                font-size: 13px;
-                border: 1px solid #ccc;
-                border-radius: 3px;
-                background-color: white;
-            }
-            QSpinBox:focus {
-                border: 1px solid #4CAF50;
-            }
-            QSpinBox::up-button, QSpinBox::down-button {
-                width: 0px;
-                border: none;
-            }
-        """)
+        self.server_port_edit.setProperty("role", "compactSpin")
         
         form_layout.addWidget(username_label, 1, 0)
         form_layout.addWidget(self.server_username_edit, 1, 1)
@@ -1007,6 +1249,22 @@ class FTPDownloaderGUI(QMainWindow):
                 border: 1px solid #cccccc;
                 font-weight: bold;
             }
+            /* Edit/delete buttons in each row; styled here once, not per button */
+            QPushButton {
+                background-color: #f2f2f2;
+                border: 1px solid #cccccc;
+                border-radius: 6px;
+                padding: 4px 8px;
+                font-size: 14px;
+            }
+            QPushButton:hover {
+                background-color: #e6e6e6;
+                border-color: #999999;
+            }
+            QPushButton:pressed {
+                background-color: #d9d9d9;
+                border-color: #888888;
+            }
         """)
 
         list_layout.addWidget(self.servers_table)
@@ -1031,6 +1289,11 @@ class FTPDownloaderGUI(QMainWindow):
                     self.selected_username = server["username"]
                     self.selected_host = server["host"]
 
+    def on_station_server_changed(self):
+        """Station Settings server changed: list its stations, then remember it."""
+        self.load_stations_for_server()
+        self.on_server_selected()
+
     def create_station_settings_tab(self):
         """Create Station Settings sub-tab"""
         station_widget = QWidget()
@@ -1046,8 +1309,7 @@ class FTPDownloaderGUI(QMainWindow):
         server_layout = QVBoxLayout(server_group)
 
         self.station_server_combo = QComboBox()
-        self.station_server_combo.currentTextChanged.connect(self.load_stations_for_server)
-        self.station_server_combo.currentTextChanged.connect(self.on_server_selected)
+        self.station_server_combo.currentTextChanged.connect(self.on_station_server_changed)
         server_layout.addWidget(self.station_server_combo)
         left_layout.addWidget(server_group)
         
@@ -1147,16 +1409,21 @@ class FTPDownloaderGUI(QMainWindow):
         layout = QVBoxLayout(self.main_tab_widget)
         
         self.server_tabs = QTabWidget()
+        self.server_tabs.currentChanged.connect(self.on_server_tab_changed)
         layout.addWidget(self.server_tabs)
-        
-        self.refresh_main_tabs()
+        # Server tabs are filled by load_data() -> refresh_main_tabs()
     
-    def create_server_main_tab(self, server):
-        """Create main tab for a specific server"""
+    def create_server_main_tab(self, server, server_widget=None, settings=None):
+        """Create main tab for a specific server, or fill in an empty server_widget
+
+        settings holds values already fetched with get_settings_bulk();
+        anything missing from it is read with get_setting().
+        """
         if not self.db_manager:
             return QWidget()
 
-        server_widget = ServerWidget()
+        if server_widget is None:
+            server_widget = ServerWidget()
         layout = QVBoxLayout(server_widget)
 
         stations_layout = QHBoxLayout()
@@ -1166,9 +1433,10 @@ class FTPDownloaderGUI(QMainWindow):
 
         available_stations = CheckboxListWidget("")
         stations = self.db_manager.get_stations(server['username'])
-        for station in stations:
-            if not station['is_selected']:
-                available_stations.add_item(station['station_id'], station['station_id'])
+        available_stations.add_items(
+            (station['station_id'], station['station_id'])
+            for station in stations if not station['is_selected']
+        )
 
         available_layout.addWidget(available_stations)
         stations_layout.addWidget(available_group)
@@ -1190,9 +1458,10 @@ class FTPDownloaderGUI(QMainWindow):
 
         # Create a special list widget for selected stations (no checkboxes needed for download)
         selected_stations = CheckboxListWidget("")
-        for station in stations:
-            if station['is_selected']:
-                selected_stations.add_item(station['station_id'], station['station_id'], False)  # Don't check by default
+        selected_stations.add_items(
+            (station['station_id'], station['station_id'], False)  # Don't check by default
+            for station in stations if station['is_selected']
+        )
 
         selected_layout.addWidget(selected_stations)
         stations_layout.addWidget(selected_group)
@@ -1209,7 +1478,11 @@ class FTPDownloaderGUI(QMainWindow):
 
         local_folder_edit = QLineEdit()
         username = server["username"]
-        local_folder_edit.setText(self.db_manager.get_setting(f'server_{username}_local_folder'))
+        folder_key = f'server_{username}_local_folder'
+        if settings is not None and folder_key in settings:
+            local_folder_edit.setText(settings[folder_key])
+        else:
+            local_folder_edit.setText(self.db_manager.get_setting(folder_key))
         browse_btn = QPushButton("Browse")
         browse_btn.clicked.connect(lambda: self.browse_folder(local_folder_edit, server['username']))
 
@@ -1273,22 +1546,7 @@ class FTPDownloaderGUI(QMainWindow):
         auto_time_edit.setDisplayFormat("HH:mm")
         auto_time_edit.setTime(QTime(17, 0))  # Default 17:00
         auto_time_edit.setFixedWidth(70)
-        auto_time_edit.setStyleSheet("""
-            QTimeEdit {
-                padding: 6px 8px;
-                font-size: 13px;
-                border: 1px solid #ccc;
-                border-radius: 3px;
-                background-color: white;
-            }
-            QTimeEdit:focus {
-                border: 1px solid #4CAF50;
-            }
-            QTimeEdit::up-button, QTimeEdit::down-button {
-                width: 0px;
-                border: none;
-            }
-        """)
+        auto_time_edit.setProperty("role", "compactSpin")
 
         auto_layout.addWidget(auto_download_checkbox)
         auto_layout.addWidget(auto_time_edit)
@@ -1348,7 +1606,10 @@ class FTPDownloaderGUI(QMainWindow):
     def create_history_tab(self):
         """Create History tab"""
         history_widget = QWidget()
+        self.history_widget = history_widget
         self.main_tabs.addTab(history_widget, "History")
+        # Catch up on entries logged while another tab was shown
+        self.main_tabs.currentChanged.connect(self._refresh_visible_history)
         
         layout = QVBoxLayout(history_widget)
         
@@ -1400,17 +1661,23 @@ class FTPDownloaderGUI(QMainWindow):
         """)
         layout.addWidget(self.history_stats_label)
         
-        # History display
-        self.history_text = QTextEdit()
-        self.history_text.setReadOnly(True)
-        self.history_text.setFont(QFont("Consolas", 9))
-        self.history_text.setStyleSheet("""
-            QTextEdit {
+        # History display; the view only lays out rows the model has fetched
+        self.history_model = HistoryModel(self)
+        self.history_view = QTableView()
+        self.history_view.setModel(self.history_model)
+        self.history_view.setFont(QFont("Consolas", 9))
+        self.history_view.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.history_view.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.history_view.setWordWrap(False)
+        self.history_view.verticalHeader().setVisible(False)
+        self.history_view.horizontalHeader().setStretchLastSection(True)
+        self.history_view.setStyleSheet("""
+            QTableView {
                 background-color: #fafafa;
                 border: 1px solid #ddd;
             }
         """)
-        layout.addWidget(self.history_text)
+        layout.addWidget(self.history_view)
     
     def add_server(self):
         """Add new server"""
@@ -1476,6 +1743,14 @@ class FTPDownloaderGUI(QMainWindow):
             return
             
         servers = self.db_manager.get_servers()
+        # One repaint for the whole table instead of one per cell
+        self.servers_table.setUpdatesEnabled(False)
+        try:
+            self._fill_servers_table(servers)
+        finally:
+            self.servers_table.setUpdatesEnabled(True)
+
+    def _fill_servers_table(self, servers):
         self.servers_table.setRowCount(len(servers))
         
         for row, server in enumerate(servers):
@@ -1483,30 +1758,11 @@ class FTPDownloaderGUI(QMainWindow):
             self.servers_table.setItem(row, 1, QTableWidgetItem(server['username']))
             self.servers_table.setItem(row, 2, QTableWidgetItem(server.get('remote_path', '')))
             
-            button_style = """
-            QPushButton {
-                background-color: #f2f2f2;
-                border: 1px solid #cccccc;
-                border-radius: 6px;
-                padding: 4px 8px;
-                font-size: 14px;
-            }
-            QPushButton:hover {
-                background-color: #e6e6e6;
-                border-color: #999999;
-            }
-            QPushButton:pressed {
-                background-color: #d9d9d9;
-                border-color: #888888;
-            }"""
-            
             edit_btn = QPushButton("✏️")
-            edit_btn.setStyleSheet(button_style)
             edit_btn.clicked.connect(lambda checked, s=server: self.edit_server(s))
             self.servers_table.setCellWidget(row, 3, edit_btn)
             
             delete_btn = QPushButton("🗑️")
-            delete_btn.setStyleSheet(button_style)
             delete_btn.clicked.connect(lambda checked, s=server: self.delete_server(s))
             self.servers_table.setCellWidget(row, 4, delete_btn)
     
@@ -1632,11 +1888,13 @@ class FTPDownloaderGUI(QMainWindow):
         server = next((s for s in servers if s["username"] == server_text), None)
 
         if server:
-            self.stations_list.clear_items()
             stations = self.db_manager.get_stations(server['username'])
-            
-            for station in stations:
-                self.stations_list.add_item(station['station_id'], station['station_id'])
+            # Repopulate quietly; add_items() refreshes Select All once at the end
+            with QSignalBlocker(self.stations_list.list_widget):
+                self.stations_list.clear_items()
+                self.stations_list.add_items(
+                    (station['station_id'], station['station_id']) for station in stations
+                )
     
     def add_station(self):
         """Add new station"""
@@ -1704,8 +1962,12 @@ class FTPDownloaderGUI(QMainWindow):
             QMessageBox.warning(self, "Warning", "Please select servers to add")
             return
         
-        for username in selected_data:
-            self.db_manager.update_server_selection(username, True)
+        try:
+            with self.db_manager.transaction():
+                for username in selected_data:
+                    self.db_manager.update_server_selection(username, True)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to add servers:\n{str(e)}")
         
         self.refresh_server_selection_lists()
         self.refresh_main_tabs()
@@ -1722,8 +1984,12 @@ class FTPDownloaderGUI(QMainWindow):
             QMessageBox.warning(self, "Warning", "Please select servers to remove")
             return
         
-        for username in selected_data:
-            self.db_manager.update_server_selection(username, False)
+        try:
+            with self.db_manager.transaction():
+                for username in selected_data:
+                    self.db_manager.update_server_selection(username, False)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to remove servers:\n{str(e)}")
         
         self.refresh_server_selection_lists()
         self.refresh_main_tabs()
@@ -1739,13 +2005,14 @@ class FTPDownloaderGUI(QMainWindow):
         self.saved_servers_list.clear_items()
         self.selected_servers_list.clear_items()
         
-        for server in servers:
-            server_display = f"{server['username']}"
-            
-            if server['is_selected']:
-                self.selected_servers_list.add_item(server_display, server['username'])
-            else:
-                self.saved_servers_list.add_item(server_display, server['username'])
+        self.selected_servers_list.add_items(
+            (f"{server['username']}", server['username'])
+            for server in servers if server['is_selected']
+        )
+        self.saved_servers_list.add_items(
+            (f"{server['username']}", server['username'])
+            for server in servers if not server['is_selected']
+        )
     
     def refresh_main_tabs(self):
         """Refresh main tabs based on selected servers"""
@@ -1753,6 +2020,8 @@ class FTPDownloaderGUI(QMainWindow):
             return
             
         self.server_tabs.clear()
+        self._pending_server_tabs.clear()
+        self._server_widgets.clear()
         
         servers = self.db_manager.get_servers()
         selected_servers = [s for s in servers if s['is_selected']]
@@ -1763,8 +2032,15 @@ class FTPDownloaderGUI(QMainWindow):
             placeholder.setStyleSheet("color: #666; font-size: 14px;")
             self.server_tabs.addTab(placeholder, "No Servers")
         else:
+            # One query for every server tab's saved settings
+            settings = self.db_manager.get_settings_bulk(
+                [f"server_{server['username']}_local_folder" for server in selected_servers]
+            )
             for server in selected_servers:
-                server_widget = self.create_server_main_tab(server)
+                # Empty until first shown; on_server_tab_changed builds it
+                server_widget = ServerWidget()
+                self._pending_server_tabs[server_widget] = (server, settings)
+                self._server_widgets[server['username']] = server_widget
                 tab_name = f"{server['username']}"
                 self.server_tabs.addTab(server_widget, tab_name)
     
@@ -1779,19 +2055,21 @@ class FTPDownloaderGUI(QMainWindow):
             QMessageBox.warning(self, "Warning", "Please select stations to move")
             return
         
-        for station_id in selected_data:
-            self.db_manager.update_station_selection(station_id, username, is_selected)
+        self.db_manager.update_stations_selection_bulk(selected_data, username, is_selected)
         
         stations = self.db_manager.get_stations(username)
         
         from_list.clear_items()
         to_list.clear_items()
         
-        for station in stations:
-            if station['is_selected'] == is_selected:
-                to_list.add_item(station['station_id'], station['station_id'], True)
-            else:
-                from_list.add_item(station['station_id'], station['station_id'])
+        to_list.add_items(
+            (station['station_id'], station['station_id'], True)
+            for station in stations if station['is_selected'] == is_selected
+        )
+        from_list.add_items(
+            (station['station_id'], station['station_id'])
+            for station in stations if station['is_selected'] != is_selected
+        )
     
     def browse_folder(self, folder_edit, username):
         """Browse for local folder"""
@@ -1811,20 +2089,13 @@ class FTPDownloaderGUI(QMainWindow):
         
         username = server['username']
         
-        # Clean up any existing worker/thread safely
-        self.safe_cleanup_worker(username)
-        
-        # Check if download is still running after cleanup
-        if username in self.download_workers:
-            worker = self.download_workers[username]
-            if worker.is_running:
-                QMessageBox.warning(self, "Download In Progress", 
-                                f"A download is already running for {username}. Please wait or cancel it first.")
-                return
+        # Cancel any existing worker; start only once it has really exited
+        if not self.safe_cleanup_worker(username):
+            self.warn_worker_stopping(username)
+            return
         
         # Get ALL stations from the Selected Stations list
-        all_selected_items = [(item.text(), item.property("data")) for item in selected_stations.items]
-        selected_station_data = [data for text, data in all_selected_items if data is not None]
+        selected_station_data = selected_stations.get_all_data()
         
         if not selected_station_data:
             QMessageBox.warning(self, "Warning", "No stations in Selected Stations list.\n\nPlease add stations using the 'Add →' button.")
@@ -1860,28 +2131,14 @@ class FTPDownloaderGUI(QMainWindow):
         
         # Create new worker and thread
         worker = DownloadWorker(server, selected_station_data, params, self.db_manager)
-        thread = QThread()
         
         worker.progress_updated.connect(self.update_progress)
         worker.finished.connect(self.download_finished)
         worker.log_message.connect(self.log_activity)
         
-        def cleanup_thread():
-            """Clean up thread after worker finishes"""
-            thread.quit()
-            thread.wait()
-            self.log_activity(f"Thread cleanup completed for {username}")
-        
-        worker.finished.connect(cleanup_thread)
-        
-        worker.moveToThread(thread)
-        worker.set_thread(thread)
-        thread.started.connect(worker.run)
-        
         self.download_workers[username] = worker
-        self.download_threads[username] = thread
         
-        thread.start()
+        self.download_pool.start(worker.run)
         
         self.log_activity(f"Started download for server {username} with {len(selected_station_data)} stations")
             
@@ -1914,7 +2171,7 @@ class FTPDownloaderGUI(QMainWindow):
             "end_date": end_date.date().toString("yyyy-MM-dd"),
             "start_time": start_time.time().toString("HH:mm"),
             "end_time": end_time.time().toString("HH:mm"),
-            "selected_stations": [item.property("data") for item in selected_stations.items if item.property("data")],
+            "selected_stations": [data for data in selected_stations.get_all_data() if data],
         }
 
         self.db_manager.set_setting(f"server_{username}_auto_settings", json.dumps(settings))
@@ -1980,44 +2237,38 @@ class FTPDownloaderGUI(QMainWindow):
 
     def update_progress(self, server_info, status, total, downloaded, failed, current_file):
             """Update progress display - NO PROGRESS BAR, just status text"""
-            for i in range(self.server_tabs.count()):
-                if self.server_tabs.tabText(i) == server_info:
-                    widget = self.server_tabs.widget(i)
-                    if isinstance(widget, ServerWidget):
-                        # Update status label only (no progress bar)
-                        if widget.status_label:
-                            # Show detailed status
-                            status_text = f"{status}"
-                            if downloaded > 0 or failed > 0:
-                                status_text += f" | ✅ {downloaded} | ❌ {failed}"
-                            if current_file and current_file != "batch":
-                                # Truncate long filenames
-                                display_file = current_file if len(current_file) < 40 else current_file[:37] + "..."
-                                status_text += f" | {display_file}"
-                            widget.status_label.setText(status_text)
-                    break
+            widget = self.get_server_widget(server_info)
+            if widget:
+                # Update status label only (no progress bar)
+                if widget.status_label:
+                    # Show detailed status
+                    status_text = f"{status}"
+                    if downloaded > 0 or failed > 0:
+                        status_text += f" | ✅ {downloaded} | ❌ {failed}"
+                    if current_file and current_file != "batch":
+                        # Truncate long filenames
+                        display_file = current_file if len(current_file) < 40 else current_file[:37] + "..."
+                        status_text += f" | {display_file}"
+                    widget.status_label.setText(status_text)
 
     def download_finished(self, server_info, downloaded, failed):
         """Handle download completion with detailed options"""
         
         # Update status label
-        for i in range(self.server_tabs.count()):
-            if self.server_tabs.tabText(i) == server_info:
-                widget = self.server_tabs.widget(i)
-                if isinstance(widget, ServerWidget):
-                    if widget.status_label:
-                        # ✅ FIX: Better status messages
-                        if downloaded == 0 and failed == 0:
-                            widget.status_label.setText("✅ All files already exist - no new downloads")
-                        elif failed > 0:
-                            widget.status_label.setText(f"⚠️ Completed with {failed} failures")
-                        else:
-                            widget.status_label.setText("✅ Download completed successfully")
-                    
-                    if widget.progress_bar:
-                        widget.progress_bar.setVisible(False)
-                        widget.progress_bar.setValue(0)
-                    break
+        widget = self.get_server_widget(server_info)
+        if widget:
+            if widget.status_label:
+                # ✅ FIX: Better status messages
+                if downloaded == 0 and failed == 0:
+                    widget.status_label.setText("✅ All files already exist - no new downloads")
+                elif failed > 0:
+                    widget.status_label.setText(f"⚠️ Completed with {failed} failures")
+                else:
+                    widget.status_label.setText("✅ Download completed successfully")
+            
+            if widget.progress_bar:
+                widget.progress_bar.setVisible(False)
+                widget.progress_bar.setValue(0)
 
         # ✅ FIX: Don't show dialog if no files were processed
         if downloaded == 0 and failed == 0:
@@ -2034,21 +2285,16 @@ class FTPDownloaderGUI(QMainWindow):
         
         # ✅ NEW: Check if all "failures" are actually empty files on server
         try:
-            log_file = "download_log.json"
-            empty_files_count = 0
-            
-            if os.path.exists(log_file):
-                with open(log_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                
-                # Count recent empty file warnings for this server
-                recent_failures = [
-                    e for e in data[-100:]  # Check last 100 entries
-                    if e.get("username") == server_info 
-                    and e.get("status") == "failed"
-                    and "0 bytes" in e.get("message", "").lower()
-                ]
-                empty_files_count = len(recent_failures)
+            data = read_download_log()
+            
+            # Count recent empty file warnings for this server
+            recent_failures = [
+                e for e in data[-100:]  # Check last 100 entries
+                if e.get("username") == server_info 
+                and e.get("status") == "failed"
+                and "0 bytes" in e.get("message", "").lower()
+            ]
+            empty_files_count = len(recent_failures)
         except:
             empty_files_count = 0
         
@@ -2210,23 +2456,20 @@ class FTPDownloaderGUI(QMainWindow):
         """Handle download completion with detailed options"""
         
         # Update status label
-        for i in range(self.server_tabs.count()):
-            if self.server_tabs.tabText(i) == server_info:
-                widget = self.server_tabs.widget(i)
-                if isinstance(widget, ServerWidget):
-                    if widget.status_label:
-                        # ✅ FIX: Better status messages
-                        if downloaded == 0 and failed == 0:
-                            widget.status_label.setText("✅ All files already exist - no new downloads")
-                        elif failed > 0:
-                            widget.status_label.setText(f"⚠️ Completed with {failed} failures")
-                        else:
-                            widget.status_label.setText("✅ Download completed successfully")
-                    
-                    if widget.progress_bar:
-                        widget.progress_bar.setVisible(False)
-                        widget.progress_bar.setValue(0)
-                    break
+        widget = self.get_server_widget(server_info)
+        if widget:
+            if widget.status_label:
+                # ✅ FIX: Better status messages
+                if downloaded == 0 and failed == 0:
+                    widget.status_label.setText("✅ All files already exist - no new downloads")
+                elif failed > 0:
+                    widget.status_label.setText(f"⚠️ Completed with {failed} failures")
+                else:
+                    widget.status_label.setText("✅ Download completed successfully")
+            
+            if widget.progress_bar:
+                widget.progress_bar.setVisible(False)
+                widget.progress_bar.setValue(0)
 
         # ✅ FIX: Don't show dialog if no files were processed
         if downloaded == 0 and failed == 0:
@@ -2359,23 +2602,20 @@ class FTPDownloaderGUI(QMainWindow):
         self.log_activity(f"Download finished for {server_info}: {downloaded} success, {failed} failed")
         
         # Update status label
-        for i in range(self.server_tabs.count()):
-            if self.server_tabs.tabText(i) == server_info:
-                widget = self.server_tabs.widget(i)
-                if isinstance(widget, ServerWidget):
-                    if widget.status_label:
-                        # ✅ FIX: Better status messages
-                        if downloaded == 0 and failed == 0:
-                            widget.status_label.setText("✅ All files already exist - no new downloads")
-                        elif failed > 0:
-                            widget.status_label.setText(f"⚠️ Completed with {failed} failures")
-                        else:
-                            widget.status_label.setText("✅ Download completed successfully")
-                    
-                    if widget.progress_bar:
-                        widget.progress_bar.setVisible(False)
-                        widget.progress_bar.setValue(0)
-                    break
+        widget = self.get_server_widget(server_info)
+        if widget:
+            if widget.status_label:
+                # ✅ FIX: Better status messages
+                if downloaded == 0 and failed == 0:
+                    widget.status_label.setText("✅ All files already exist - no new downloads")
+                elif failed > 0:
+                    widget.status_label.setText(f"⚠️ Completed with {failed} failures")
+                else:
+                    widget.status_label.setText("✅ Download completed successfully")
+            
+            if widget.progress_bar:
+                widget.progress_bar.setVisible(False)
+                widget.progress_bar.setValue(0)
 
         # ✅ FIX: Don't show dialog if no files were processed
         if downloaded == 0 and failed == 0:
@@ -2510,15 +2750,12 @@ class FTPDownloaderGUI(QMainWindow):
     def show_failed_files(self, server_info):
         """Show list of failed files from history - FIXED to show unique failed files"""
         try:
-            log_file = "download_log.json"
+            data = read_download_log()
             
-            if not os.path.exists(log_file):
+            if not data:
                 QMessageBox.information(self, "No Data", "No download history found.")
                 return
             
-            with open(log_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            
             # ✅ FIX: Get UNIQUE failed files (most recent status only)
             file_status = {}  # {(station, filename): (status, timestamp, entry)}
             
@@ -2598,16 +2835,13 @@ class FTPDownloaderGUI(QMainWindow):
     def retry_failed_files(self, server_info):
         """Retry downloading failed files - improved logic with proper counting"""
         try:
-            log_file = "download_log.json"
+            # Read log and get failed files
+            data = read_download_log()
             
-            if not os.path.exists(log_file):
+            if not data:
                 QMessageBox.warning(self, "No Data", "No download history found.")
                 return
             
-            # Read log and get failed files
-            with open(log_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            
             # Get UNIQUE failed files (only keep the most recent status per file)
             file_status = {}  # {(station, filename): (status, timestamp, entry)}
             
@@ -2751,30 +2985,19 @@ class FTPDownloaderGUI(QMainWindow):
                 'local_folder': local_folder
             }
             
-            # Clean up any existing worker
-            self.safe_cleanup_worker(server_info)
+            # Clean up any existing worker; start only once it has really exited
+            if not self.safe_cleanup_worker(server_info):
+                self.warn_worker_stopping(server_info)
+                return
             
             # Create new worker for retry
             worker = DownloadWorker(server, stations_to_retry, params, self.db_manager)
-            thread = QThread()
             
             worker.progress_updated.connect(self.update_progress)
             worker.finished.connect(self.download_finished)
             worker.log_message.connect(self.log_activity)
             
-            def cleanup_thread():
-                thread.quit()
-                thread.wait()
-                self.log_activity(f"Retry thread cleanup completed for {server_info}")
-            
-            worker.finished.connect(cleanup_thread)
-            
-            worker.moveToThread(thread)
-            worker.set_thread(thread)
-            thread.started.connect(worker.run)
-            
             self.download_workers[server_info] = worker
-            self.download_threads[server_info] = thread
             
             # Show progress bar
             if server_widget.progress_bar:
@@ -2783,19 +3006,12 @@ class FTPDownloaderGUI(QMainWindow):
             if server_widget.status_label:
                 server_widget.status_label.setText("Retrying failed files...")
             
-            thread.start()
+            self.download_pool.start(worker.run)
             
             self.log_activity(
                 f"Started retry for {total_failed} failed files across {len(stations_to_retry)} stations on {server_info}"
             )
             
-        except json.JSONDecodeError:
-            QMessageBox.critical(
-                self,
-                "Corrupted History",
-                "Download history file is corrupted.\n\n"
-                "Please clear the history using the History tab."
-            )
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to prepare retry:\n{str(e)}")
             self.log_activity(f"Retry preparation failed: {str(e)}")
@@ -2804,25 +3020,10 @@ class FTPDownloaderGUI(QMainWindow):
         """Start download worker for retrying failed files"""
         username = server['username']
         
-        # Clean up any old workers
-        if username in self.download_workers:
-            old_worker = self.download_workers[username]
-            old_thread = self.download_threads.get(username)
-            
-            try:
-                old_worker.stop()
-                if old_thread and old_thread.isRunning():
-                    old_thread.quit()
-                    old_thread.wait(2000)
-                    if old_thread.isRunning():
-                        old_thread.terminate()
-                        old_thread.wait()
-            except Exception as e:
-                self.log_activity(f"Error cleaning up old thread: {e}")
-            
-            del self.download_workers[username]
-            if username in self.download_threads:
-                del self.download_threads[username]
+        # Clean up any old worker; start only once it has really exited
+        if not self.safe_cleanup_worker(username):
+            self.warn_worker_stopping(username)
+            return
         
         # Get all station IDs to retry
         station_ids = list(stations_to_retry.keys())
@@ -2843,26 +3044,12 @@ class FTPDownloaderGUI(QMainWindow):
         
         # Create retry worker
         worker = RetryDownloadWorker(server, station_ids, params, self.db_manager, stations_to_retry)
-        thread = QThread()
         
         worker.progress_updated.connect(self.update_progress)
         worker.finished.connect(self.download_finished)
         worker.log_message.connect(self.log_activity)
         
-        def cleanup_thread():
-            """Clean up thread after worker finishes"""
-            thread.quit()
-            thread.wait()
-            self.log_activity(f"Retry thread cleanup completed for {username}")
-        
-        worker.finished.connect(cleanup_thread)
-        
-        worker.moveToThread(thread)
-        worker.set_thread(thread)
-        thread.started.connect(worker.run)
-        
         self.download_workers[username] = worker
-        self.download_threads[username] = thread
         
         # Show progress UI
         # if server_widget.progress_bar:
@@ -2871,7 +3058,7 @@ class FTPDownloaderGUI(QMainWindow):
         if server_widget.status_label:
             server_widget.status_label.setText("Retrying failed files...")
         
-        thread.start()
+        self.download_pool.start(worker.run)
         
         QMessageBox.information(
             self,
@@ -2883,15 +3070,12 @@ class FTPDownloaderGUI(QMainWindow):
     def export_failed_files(self, server_info):
         """Export failed files list to CSV"""
         try:
-            log_file = "download_log.json"
+            data = read_download_log()
             
-            if not os.path.exists(log_file):
+            if not data:
                 QMessageBox.warning(self, "No Data", "No download history found.")
                 return
             
-            with open(log_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            
             # Filter failed files
             failed_files = [
                 entry for entry in data 
@@ -2911,7 +3095,6 @@ class FTPDownloaderGUI(QMainWindow):
             )
             
             if filename:
-                import csv
                 with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
                     writer = csv.writer(csvfile)
                     writer.writerow(['Timestamp', 'Username', 'Station ID', 'Filename', 'Error Message'])
@@ -2937,73 +3120,44 @@ class FTPDownloaderGUI(QMainWindow):
 
     
     def refresh_history(self):
+        """Schedule a history refresh; calls in quick succession share one rebuild."""
+        self._history_refresh_timer.start()
+
+    def _refresh_visible_history(self):
+        """Refresh history only while the History tab is the one shown."""
+        if self.main_tabs.currentWidget() is self.history_widget:
+            self.refresh_history()
+
+    def _do_refresh_history(self):
         """Refresh download history display with smart filtering and limits."""
         try:
-            log_file = "download_log.json"
-            
-            # Check if file exists
-            if not os.path.exists(log_file):
-                self.history_text.setPlainText("No download history yet.\n\nHistory will appear here after your first download.")
-                self.history_stats_label.setText("Total: 0 | Success: 0 | Failed: 0")
-                return
+            # Corrupted lines are skipped by the JSON Lines reader
+            data = read_download_log()
 
-            # Read the log file with better error handling
-            try:
-                with open(log_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            except json.JSONDecodeError as json_err:
-                # JSON is corrupted - offer to fix it
-                error_msg = f"⚠️ Download history file is corrupted!\n\n"
-                error_msg += f"Error: {str(json_err)}\n\n"
-                error_msg += "Would you like to:\n"
-                error_msg += "1. Backup corrupted file and start fresh\n"
-                error_msg += "2. Try to recover partial data\n\n"
-                error_msg += "Click 'Yes' to backup and reset, 'No' to try recovery."
-                
-                reply = QMessageBox.question(
-                    self,
-                    "Corrupted History File",
-                    error_msg,
-                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-                )
-                
-                if reply == QMessageBox.StandardButton.Yes:
-                    # Backup corrupted file
-                    backup_name = f"download_log_corrupted_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json.bak"
-                    try:
-                        shutil.copy(log_file, backup_name)
-                        os.remove(log_file)
-                        QMessageBox.information(
-                            self,
-                            "File Reset",
-                            f"✅ Corrupted file backed up as:\n{backup_name}\n\nHistory has been reset."
-                        )
-                        self.history_text.setPlainText("History reset. New downloads will appear here.")
-                        self.history_stats_label.setText("Total: 0 | Success: 0 | Failed: 0")
-                    except Exception as e:
-                        QMessageBox.critical(self, "Backup Failed", f"Could not backup file:\n{str(e)}")
-                    return
-                else:
-                    # Try to recover partial data
-                    data = self.attempt_json_recovery(log_file)
-                    if not data:
-                        self.history_text.setPlainText(
-                            "❌ Could not recover data from corrupted file.\n\n"
-                            "Please use 'Clear History' to reset, or manually delete:\n"
-                            f"{os.path.abspath(log_file)}"
-                        )
-                        self.history_stats_label.setText("Error: Corrupted file")
-                        return
+            # Get filter settings
+            filter_limit = self.history_filter_combo.currentText()
+            status_filter = self.status_filter_combo.currentText()
+
+            # Nothing logged and no filter change since the last rebuild. The
+            # last entry is compared by content, never by object identity
+            last_entry = data[-1] if data else {}
+            view_key = (
+                len(data),
+                tuple(last_entry.get(field) for field in HistoryModel.LOG_FIELDS),
+                filter_limit,
+                status_filter,
+            )
+            if view_key == self._history_view_key:
+                return
+            self._history_view_key = view_key
 
             # Check if there's any data
             if not data or len(data) == 0:
-                self.history_text.setPlainText("No download history yet.\n\nHistory will appear here after your first download.")
-                self.history_stats_label.setText("Total: 0 | Success: 0 | Failed: 0")
+                self.history_model.reload([])
+                self.history_stats_label.setText(
+                    "No download history yet. History will appear here after your first download."
+                )
                 return
-
-            # Get filter settings
-            filter_limit = self.history_filter_combo.currentText()
-            status_filter = self.status_filter_combo.currentText()
             
             # Apply status filter
             filtered_data = data
@@ -3035,81 +3189,27 @@ class FTPDownloaderGUI(QMainWindow):
             
             # Reverse to show most recent first
             display_data = list(reversed(display_data))
-            
-            # Build history lines
-            lines = []
-            for entry in display_data:
-                ts = entry.get("timestamp", "N/A")
-                username = entry.get("username", "N/A")
-                station = entry.get("station_id", "N/A")
-                filename = entry.get("filename", "N/A")
-                status = entry.get("status", "N/A")
-                msg = entry.get("message", "N/A")
-                
-                # Color code status
-                status_str = status.upper()
-                lines.append(f"[{ts}] {username} | {station} | {filename} | {status_str} | {msg}")
 
             # Get current scroll position
-            scroll_bar = self.history_text.verticalScrollBar()
+            scroll_bar = self.history_view.verticalScrollBar()
             old_pos = scroll_bar.value() if scroll_bar else 0
 
-            # Update text
-            self.history_text.blockSignals(True)
-            self.history_text.setPlainText("\n".join(lines))
-            self.history_text.blockSignals(False)
+            # One model reset; formatting happens per visible cell
+            self.history_model.reload(display_data)
 
-            # Restore scroll position (only if not at bottom)
-            if scroll_bar and old_pos < scroll_bar.maximum() - 50:
+            # Restore scroll position while it is still within the fetched rows
+            if scroll_bar and old_pos <= scroll_bar.maximum():
                 scroll_bar.setValue(old_pos)
-            else:
-                # Auto-scroll to top for new entries
-                scroll_bar.setValue(0)
 
         except Exception as e:
-            error_text = f"❌ Error loading history: {str(e)}\n\n"
-            error_text += "If this problem persists:\n"
-            error_text += "1. Click 'Clear History' to reset\n"
-            error_text += "2. Or manually delete: download_log.json"
-            self.history_text.setPlainText(error_text)
-            self.history_stats_label.setText("Error loading history")
+            self.history_model.reload([])
+            self.history_stats_label.setText(
+                f"❌ Error loading history: {str(e)} | If this persists, click 'Clear History' "
+                f"or delete {DOWNLOAD_LOG_FILE}"
+            )
+            self._history_view_key = None
             print(f"[ERROR] History refresh failed: {e}")
     
-    def attempt_json_recovery(self, log_file):
-        """Try to recover data from corrupted JSON file"""
-        try:
-            with open(log_file, "r", encoding="utf-8") as f:
-                content = f.read()
-            
-            # Try to find valid JSON objects
-            recovered_data = []
-            
-            # Split by newlines and try to parse each line
-            lines = content.split('\n')
-            for line in lines:
-                line = line.strip()
-                if line.startswith('{') and line.endswith('}'):
-                    try:
-                        obj = json.loads(line)
-                        if isinstance(obj, dict):
-                            recovered_data.append(obj)
-                    except:
-                        continue
-            
-            if recovered_data:
-                QMessageBox.information(
-                    self,
-                    "Partial Recovery",
-                    f"✅ Recovered {len(recovered_data)} entries from corrupted file.\n\n"
-                    "Some data may be lost. Consider exporting the recovered data."
-                )
-                return recovered_data
-            
-            return None
-        except Exception as e:
-            print(f"[ERROR] Recovery failed: {e}")
-            return None
-    
     def clear_history(self):
         """Clear history with confirmation"""
         reply = QMessageBox.question(
@@ -3120,9 +3220,9 @@ class FTPDownloaderGUI(QMainWindow):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            if os.path.exists("download_log.json"):
-                os.remove("download_log.json")
-            self.history_text.setPlainText("History cleared.")
+            clear_download_log()
+            self.history_model.reload([])
+            self._history_view_key = None
             self.history_stats_label.setText("Total: 0 | Success: 0 | Failed: 0")
             self.log_activity("History cleared by user")
     
@@ -3133,7 +3233,7 @@ class FTPDownloaderGUI(QMainWindow):
         if filename:
             try:
                 with open(filename, 'w') as f:
-                    f.write(self.history_text.toPlainText())
+                    f.write(self.history_model.to_text())
                 QMessageBox.information(self, "Success", f"History exported to {filename}")
                 self.log_activity(f"History exported to {filename}")
             except Exception as e:
@@ -3223,11 +3323,11 @@ class FTPDownloaderGUI(QMainWindow):
             return
             
         servers = self.db_manager.get_servers() if self.db_manager else []
-        self.station_server_combo.clear()
-        
-        for server in servers:
-            display_text = server["username"]
-            self.station_server_combo.addItem(display_text)
+        # Fill silently, then react to the resulting selection once
+        with QSignalBlocker(self.station_server_combo):
+            self.station_server_combo.clear()
+            self.station_server_combo.addItems([server["username"] for server in servers])
+        self.on_station_server_changed()
     
     def closeEvent(self, event):
         """Ensure all threads and resources are closed before exiting."""
@@ -3240,18 +3340,12 @@ class FTPDownloaderGUI(QMainWindow):
                 except Exception as e:
                     print(f"[WARN] Error stopping worker {username}: {e}")
             
-            # Stop all threads
-            for username, thread in list(self.download_threads.items()):
-                try:
-                    if thread.isRunning():
-                        thread.quit()
-                        thread.wait(3000)
-                        if thread.isRunning():
-                            thread.terminate()
-                            thread.wait()
-                        self.log_activity(f"Thread stopped for {username}")
-                except Exception as e:
-                    print(f"[WARN] Error stopping thread {username}: {e}")
+            # Give the cancelled workers a moment to return their pool threads
+            if not self.download_pool.waitForDone(3000):
+                print("[WARN] Some download workers are still stopping")
+            
+            # Close any FTP sessions still cached by worker threads
+            ftp_close_all()
             
             # Close database
             if hasattr(self, "db_manager") and self.db_manager:
@@ -3317,15 +3411,7 @@ def main():
                 except Exception as e:
                     print(f"[WARN] Error stopping worker {username}: {e}")
             
-            for username, thread in list(window.download_threads.items()):
-                try:
-                    if thread.isRunning():
-                        thread.quit()
-                        thread.wait(2000)
-                        if thread.isRunning():
-                            thread.terminate()
-                except Exception as e:
-                    print(f"[WARN] Error stopping thread {username}: {e}")
+            window.download_pool.waitForDone(2000)
             
             db.close()
             print("[INFO] Database connection closed.")